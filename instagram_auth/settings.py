@@ -66,9 +66,22 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ],
 }
+# JWT bilan autentifikatsiya qilingan foydalanuvchilar keshi (users.authentication)
+AUTH_USER_CACHE = {
+    "LOCAL_TTL": 5,  # Jarayon ichidagi LRU keshda saqlanish muddati (soniya)
+    "LOCAL_MAXSIZE": 10000,
+    # Django keshida saqlanish muddati (soniya). CACHES da umumiy backend (Redis, Memcached) bo'lmasa
+    # (standart LocMemCache har jarayonda alohida) LOCAL_TTL bilan cheklanadi, aks holda boshqa
+    # workerlar tokenlar bekor qilinganini shu muddat davomida bilmay qoladi
+    "SHARED_TTL": 300,
+}
+# RS256/EdDSA uchun tokenlar JWT_KEYS_DIR dagi <kid>.pem kalitlari bilan imzolanadi (users.jwks).
+# Ochiq kalitlar /users/jwks/ orqali beriladi, yangi kalit `manage.py rotate_jwt_key` bilan yaratiladi.
+JWT_ALGORITHM = config('JWT_ALGORITHM', default='HS256')
+JWT_KEYS_DIR = config('JWT_KEYS_DIR', default=str(BASE_DIR / 'keys'))
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(hours=2),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=15),
@@ -76,7 +89,7 @@ SIMPLE_JWT = {
     "BLACKLIST_AFTER_ROTATION": False,
     "UPDATE_LAST_LOGIN": False,
 
-    "ALGORITHM": "HS256",
+    "ALGORITHM": JWT_ALGORITHM,
     "SIGNING_KEY": SECRET_KEY,
     "VERIFYING_KEY": "",
     "AUDIENCE": None,
@@ -91,7 +104,7 @@ SIMPLE_JWT = {
     "USER_ID_CLAIM": "user_id",
     "USER_AUTHENTICATION_RULE": "rest_framework_simplejwt.authentication.default_user_authentication_rule",
 
-    "AUTH_TOKEN_CLASSES": ("rest_framework_simplejwt.tokens.AccessToken",),
+    "AUTH_TOKEN_CLASSES": ("users.tokens.UserAccessToken",),
     "TOKEN_TYPE_CLAIM": "token_type",
     "TOKEN_USER_CLASS": "rest_framework_simplejwt.models.TokenUser",
 
@@ -166,6 +179,25 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# PBKDF2 xeshlash alohida jarayonlar poolida bajariladi (users.hashers)
+PASSWORD_HASHERS = [
+    "users.hashers.PooledPBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+]
+# 0 - Django ning standart qiymati. `manage.py calibrate_password_hasher` mos qiymatni taklif qiladi
+PASSWORD_HASH_ITERATIONS = config('PASSWORD_HASH_ITERATIONS', default=0, cast=int)
+# Har bir web worker (gunicorn/uvicorn jarayoni) o'zining shuncha jarayonli poolini ochadi, ya'ni
+# jami web workerlar soni x PASSWORD_HASH_WORKERS jarayon bir xil yadrolar uchun raqobatlashadi.
+# 0 bo'lsa xeshlash request threadining o'zida bajariladi (hashlib.pbkdf2_hmac GIL ni qo'yib yuboradi,
+# shuning uchun threadlar parallel ishlaydi). Pool kerak bo'lsa web workerlar x qiymat yadrolar sonidan
+# oshmasligi kerak
+PASSWORD_HASH_WORKERS = config('PASSWORD_HASH_WORKERS', default=0, cast=int)
+PASSWORD_HASH_MAX_PENDING = config('PASSWORD_HASH_MAX_PENDING', default=0, cast=int)
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.0/topics/i18n/
 
@@ -188,5 +220,81 @@ STATIC_URL = "static/"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 AUTH_USER_MODEL = 'users.User'
+AUTHENTICATION_BACKENDS = [
+    'users.backends.EmailOrUsernameBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
+
+# Email jo'natish pooli (shared.mailer.EmailWorkerPool)
+EMAIL_POOL_WORKERS = config('EMAIL_POOL_WORKERS', default=4, cast=int)
+EMAIL_POOL_QUEUE_SIZE = config('EMAIL_POOL_QUEUE_SIZE', default=1000, cast=int)
+EMAIL_POOL_BATCH_SIZE = config('EMAIL_POOL_BATCH_SIZE', default=20, cast=int)
+EMAIL_POOL_PUT_TIMEOUT = config('EMAIL_POOL_PUT_TIMEOUT', default=5.0, cast=float)
+EMAIL_POOL_IDLE_TIMEOUT = config('EMAIL_POOL_IDLE_TIMEOUT', default=30.0, cast=float)
+# Kompilyatsiya qilingan email shablonlari keshining hajmi (shared.email_templates)
+EMAIL_TEMPLATE_CACHE_SIZE = 32
+# True bo'lsa emaillar EmailOutbox jadvaliga yoziladi va `manage.py dispatch_emails` orqali jo'natiladi
+EMAIL_OUTBOX = config('EMAIL_OUTBOX', default=False, cast=bool)
+# OutstandingToken yozuvlarini paketlab yozuvchi bufer (users.tokens.OutstandingTokenLedger)
+TOKEN_LEDGER = {
+    "BATCH_SIZE": 200,
+    "INTERVAL": 1.0,  # Bufer bazaga yoziladigan davr (soniya)
+    "ASYNC": True,  # False bo'lsa har bir yozuv darhol saqlanadi (testlar uchun)
+}
+# Qora ro'yxatdagi refresh tokenlarning jarayon ichidagi indeksi (users.tokens.BlacklistIndex)
+BLACKLIST_INDEX = {
+    "ENABLED": True,
+    "REFRESH_INTERVAL": 1.0,  # Bazadan yangi yozuvlarni o'qish davri (soniya)
+    "OVERLAP": 30,  # Har safar qayta o'qiladigan oxirgi yozuvlar oralig'i (soniya)
+}
+# /users/introspect/ uchun ruxsat etilgan kalitlar (vergul bilan) va bitta so'rovdagi tokenlar chegarasi
+INTROSPECTION_API_KEYS = config('INTROSPECTION_API_KEYS', default='', cast=lambda v: [k.strip() for k in v.split(',') if k.strip()])
+INTROSPECTION_MAX_TOKENS = config('INTROSPECTION_MAX_TOKENS', default=500, cast=int)
+# Barcha workerlar uchun umumiy (mmap) throttle limitlari (shared.throttling)
+SHARED_THROTTLE_RATES = {
+    "login": "10/min",
+    "signup": "5/min",
+    "verify": "10/min",
+    "forgot_password": "5/min",
+}
+# Bo'sh bo'lsa /dev/shm/instagram_auth_ratelimit ishlatiladi
+SHARED_THROTTLE_PATH = config('SHARED_THROTTLE_PATH', default='')
+SHARED_THROTTLE_SLOTS = 65536
+# Tasdiqlash kodlari ombori (users.verification). CacheCodeStore kodlarni keshda TTL bilan saqlaydi va
+# bazaga yozmaydi (barcha jarayonlar uchun umumiy kesh, masalan Redis kerak), "audit": True bo'lsa kodlar
+# UserConfirmation jadvaliga ham yoziladi.
+VERIFICATION_CODE_STORE = {
+    "BACKEND": config('VERIFICATION_CODE_STORE', default='users.verification.DatabaseCodeStore'),
+    "OPTIONS": {},
+}
+# True bo'lsa signup, verify, new-verify, login va logout uchun users.async_views ishlatiladi
+# (ASGI bilan, masalan `uvicorn instagram_auth.asgi:application`). False bo'lsa sinxron DRF viewlari.
+ASYNC_AUTH_VIEWS = config('ASYNC_AUTH_VIEWS', default=False, cast=bool)
+# Profil rasmlarining fonda yaratiladigan kichraytirilgan variantlari (users.photos).
+# Mijozlar /users/photo/?size=150&image_format=webp orqali kerakli variantni oladi.
+PHOTO_VARIANTS = {
+    "SIZES": (64, 150, 320),
+    "FORMATS": ("webp", "jpeg"),
+    "DEFAULT_FORMAT": "webp",  # /users/photo/ da ?image_format berilmasa
+    "QUALITY": 80,
+    "WORKERS": 2,
+}
+# Yuklanadigan fayllar vaqtinchalik faylga oqim bilan yoziladi va o'qish davomida tekshiriladi (shared.uploads)
+FILE_UPLOAD_HANDLERS = ['shared.uploads.LimitedUploadHandler']
+UPLOAD_LIMITS = {
+    "MAX_BYTES": config('UPLOAD_MAX_BYTES', default=5 * 1024 * 1024, cast=int),
+    "MAX_PIXELS": 4096 * 4096,
+    "MAX_SIDE": 8192,
+    "HEADER_BYTES": 256 * 1024,
+    "IMAGE_FIELDS": ("photo", ),
+    "IMAGE_FORMATS": ("JPEG", "PNG"),
+}
+# User.photo storage i (shared.storage). ContentAddressedStorage fayllarni sha256 xeshi bilan nomlaydi va
+# user_photos/ab/cd/<xesh>.jpg ko'rinishida papkalarga taqsimlaydi, bir xil rasmlar bir marta saqlanadi.
+# Eski (tekis user_photos/) fayllar `manage.py migrate_photo_storage` bilan ko'chiriladi.
+PHOTO_STORAGE = {
+    "BACKEND": "shared.storage.ContentAddressedStorage",
+    "OPTIONS": {"depth": 2, "width": 2},
+}
@@ -1,3 +1,10 @@
 from django.contrib import admin
+from .models import EmailOutbox
 
-# Register your models here.
+
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ['id', 'to_email', 'status', 'attempts', 'created_time']
+    list_filter = ['status']
+
+
+admin.site.register(EmailOutbox, EmailOutboxAdmin)
@@ -0,0 +1,44 @@
+import resource
+import threading
+import time
+
+
+def percentile(values, pct):
+    """
+    Tartiblangan ro'yxatdan berilgan foizdagi qiymatni qaytaradi (nearest-rank usuli).
+    Args:
+        values (list): O'sish tartibida saralangan qiymatlar.
+        pct (float): 0 dan 100 gacha bo'lgan foiz.
+    """
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, round(pct / 100 * len(values)) - 1))
+    return values[index]
+
+
+def peak_rss_mb():
+    """
+    Jarayonning eng yuqori rezident xotirasi (MB). Linuxda ru_maxrss kilobaytlarda qaytadi.
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class ThreadCountSampler(threading.Thread):
+    """
+    Benchmark davomida ishlayotgan threadlar sonining eng yuqori qiymatini o'lchab boruvchi thread.
+    """
+    def __init__(self, interval=0.01):
+        super(ThreadCountSampler, self).__init__(daemon=True)
+        self.interval = interval
+        self.peak = threading.active_count()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.is_set():
+            self.peak = max(self.peak, threading.active_count())
+            time.sleep(self.interval)
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+        return self.peak
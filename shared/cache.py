@@ -0,0 +1,47 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LocalTTLCache:
+    """
+    Jarayon ichidagi, yozuvlari TTL bilan eskiradigan va hajmi cheklangan LRU kesh.
+    """
+    def __init__(self, maxsize=10000, ttl=5.0):
+        """
+        Args:
+            maxsize (int): Keshda saqlanadigan yozuvlarning eng ko'p soni.
+            ttl (float): Yozuvning amal qilish muddati (soniya).
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires, value = item
+            if expires < now:
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
@@ -0,0 +1,168 @@
+import re
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.template.base import Node, TextNode, Variable, VariableNode
+from django.template.defaulttags import AutoEscapeControlNode
+from django.template.loader import get_template
+from django.template.loader_tags import ExtendsNode, IncludeNode
+from django.utils import translation
+from django.utils.html import conditional_escape
+from django.utils.safestring import mark_safe
+
+
+def _marker(name):
+    # Oddiy matnda uchramaydigan belgi bilan o'ralgan o'zgaruvchi nomi
+    return f"\x00{name}\x00"
+
+
+def _only_bare_variables(template, variables, seen=()):
+    """
+    Shablondagi o'zgaruvchilar faqat filtrsiz {{ var }} ko'rinishida ishlatilganini tekshiradi.
+    {% if var %}, {{ var|default:"..." }}, {{ var|safe }} kabi ishlatilishda natija qiymatga bog'liq
+    bo'ladi va uni statik qismlar orasiga qo'yib bo'lmaydi.
+    Args:
+        template (django.template.base.Template): Tekshiriladigan shablon.
+        variables (tuple): Har bir xabarda o'zgaradigan kontekst kalitlari.
+    Returns:
+        bool: Shablonni bo'laklarga ajratib kompilyatsiya qilish mumkin bo'lsa True.
+    """
+    # render() qiymatlarni doim ekranlaydi, avtomatik ekranlash o'chirilgan shablonlar to'liq render qilinadi
+    if not template.engine.autoescape:
+        return False
+    mentioned = re.compile(r"(?<![\w.])(?:%s)(?!\w)" % "|".join(re.escape(name) for name in variables))
+    for node in template.nodelist.get_nodes_by_type(Node):
+        if isinstance(node, TextNode):
+            continue
+        if isinstance(node, AutoEscapeControlNode) and not node.setting:
+            return False
+        if isinstance(node, VariableNode):
+            expression = node.filter_expression
+            if (not expression.filters and isinstance(expression.var, Variable)
+                    and expression.var.lookups is not None and len(expression.var.lookups) == 1
+                    and expression.var.lookups[0] in variables):
+                continue
+        elif isinstance(node, (ExtendsNode, IncludeNode)):
+            # Ota yoki qo'shiladigan shablon nomi o'zgarmas bo'lsagina uni ham tekshirish mumkin
+            name = (node.parent_name if isinstance(node, ExtendsNode) else node.template).var
+            if not isinstance(name, str):
+                return False
+            if name not in seen and not _only_bare_variables(
+                    template.engine.get_template(name), variables, (*seen, template.name)):
+                return False
+        token = getattr(node, 'token', None)
+        if token is None or mentioned.search(token.contents):
+            return False
+    return True
+
+
+class CompiledEmailTemplate:
+    """
+    Bir marta kompilyatsiya qilingan va statik qismlari oldindan render qilingan email shabloni.
+    Har bir xabar uchun faqat o'zgaruvchilar qiymatlari statik qismlar orasiga qo'yiladi.
+    """
+    def __init__(self, template_name, variables, locale=None):
+        """
+        Args:
+            template_name (str): Shablon nomi.
+            variables (tuple): Har bir xabarda o'zgaradigan kontekst kalitlari.
+            locale (str): Shablon render qilinadigan til (None bo'lsa joriy til).
+        """
+        self.template = get_template(template_name)
+        self.locale = locale
+        self.parts = None
+        self.names = None
+        self.compile(variables)
+
+    def compile(self, variables):
+        """
+        Shablonni o'zgaruvchilar o'rniga belgilar qo'yib render qiladi va natijani belgilar bo'yicha
+        bo'laklarga ajratadi. Agar o'zgaruvchi filtr, shart yoki boshqa teg ichida ishlatilgan bo'lsa
+        (shablon tugunlari bo'yicha aniqlanadi) shablon har safar to'liq render qilinadi.
+        """
+        if variables and not _only_bare_variables(self.template.template, variables):
+            return
+        context = {name: mark_safe(_marker(name)) for name in variables}
+        rendered = self._render(context)
+        if not variables:
+            self.parts, self.names = [rendered], []
+            return
+        pattern = re.compile("|".join(re.escape(_marker(name)) for name in variables))
+        found = [match.group(0).strip("\x00") for match in pattern.finditer(rendered)]
+        parts = pattern.split(rendered)
+        if set(found) != set(variables) or any("\x00" in part for part in parts):
+            return
+        self.parts = parts
+        self.names = found
+
+    def _render(self, context):
+        if self.locale is None:
+            return self.template.render(context)
+        with translation.override(self.locale):
+            return self.template.render(context)
+
+    def render(self, context):
+        """
+        Shablonni berilgan qiymatlar bilan render qiladi.
+        Args:
+            context (dict): O'zgaruvchilar qiymatlari.
+        Returns:
+            str: Tayyor HTML matn.
+        """
+        if self.parts is None:
+            return self._render(context)
+        values = [conditional_escape(context[name]) for name in self.names]
+        chunks = [self.parts[0]]
+        for value, part in zip(values, self.parts[1:]):
+            chunks.append(value)
+            chunks.append(part)
+        return "".join(chunks)
+
+
+class EmailTemplateCache:
+    """
+    Kompilyatsiya qilingan shablonlar uchun (shablon, til, o'zgaruvchilar) bo'yicha kichik LRU kesh.
+    """
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self._templates = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, template_name, variables, locale=None):
+        # Statik qismlar kompilyatsiya vaqtidagi tilda render qilinadi, shuning uchun til berilmasa
+        # kalitga joriy til yoziladi (aks holda {% trans %} matnlari boshqa tilda qaytishi mumkin)
+        locale = locale or translation.get_language()
+        key = (template_name, locale, variables)
+        with self._lock:
+            template = self._templates.get(key)
+            if template is not None:
+                self._templates.move_to_end(key)
+                return template
+        template = CompiledEmailTemplate(template_name, variables, locale)
+        with self._lock:
+            self._templates[key] = template
+            while len(self._templates) > self.maxsize:
+                self._templates.popitem(last=False)
+        return template
+
+    def clear(self):
+        with self._lock:
+            self._templates.clear()
+
+
+template_cache = EmailTemplateCache(getattr(settings, 'EMAIL_TEMPLATE_CACHE_SIZE', 32))
+
+
+def render_email(template_name, context, locale=None):
+    """
+    Email shablonini keshdan olib render qiladi. Shablon jarayon davomida bir marta yuklanadi.
+    Args:
+        template_name (str): Shablon nomi.
+        context (dict): Shablonga beriladigan qiymatlar.
+        locale (str): Til kodi (masalan "uz"), None bo'lsa joriy til ishlatiladi.
+    Returns:
+        str: Render qilingan HTML matn.
+    """
+    template = template_cache.get(template_name, tuple(sorted(context)), locale)
+    return template.render(context)
@@ -0,0 +1,242 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.mail import get_connection
+
+logger = logging.getLogger(__name__)
+
+# Worker to'xtashi kerakligini bildiruvchi belgi
+_STOP = object()
+
+
+class EmailWorker(threading.Thread):
+    """
+    Navbatdan emaillarni olib, o'zining ochiq SMTP ulanishi orqali paketlab jo'natuvchi thread.
+    """
+    def __init__(self, pool, index):
+        """
+        Args:
+            pool (EmailWorkerPool): Worker tegishli bo'lgan pool.
+            index (int): Worker tartib raqami (thread nomi uchun).
+        """
+        super(EmailWorker, self).__init__(name=f"email-worker-{index}", daemon=True)
+        self.pool = pool
+        self.connection = None
+
+    def run(self):
+        """
+        Navbatdan birinchi emailni kutadi, keyin batch_size gacha bo'lgan qolganlarini kutmasdan oladi
+        va hammasini bitta ulanish orqali jo'natadi. Uzoq vaqt ish bo'lmasa ulanish yopiladi.
+        """
+        while True:
+            try:
+                item = self.pool.queue.get(timeout=self.pool.idle_timeout)
+            except queue.Empty:
+                self.close_connection()
+                continue
+            if item is _STOP:
+                self.pool.queue.task_done()
+                break
+
+            batch = [item]
+            stop = False
+            while len(batch) < self.pool.batch_size:
+                try:
+                    item = self.pool.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self.send_batch(batch)
+            for _ in range(len(batch) + stop):
+                self.pool.queue.task_done()
+            if stop:
+                break
+        self.close_connection()
+
+    def send_batch(self, batch):
+        """
+        Emaillar paketini jo'natadi. Xatolik bo'lsa ulanish yopiladi va keyingi paket uchun qayta ochiladi.
+        Args:
+            batch (list): (email, navbatga qo'yilgan vaqt) juftliklari ro'yxati.
+        """
+        messages = [email for email, _ in batch]
+        try:
+            if self.connection is None:
+                self.connection = get_connection(fail_silently=False)
+                self.connection.open()
+            self.connection.send_messages(messages)
+        except Exception:
+            logger.exception("%d ta emailni jo'natib bo'lmadi", len(messages))
+            self.close_connection()
+            self.pool.record_failure(len(messages))
+            return
+        self.pool.record_sent([queued_at for _, queued_at in batch])
+
+    def close_connection(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except Exception:
+                logger.exception("SMTP ulanishini yopib bo'lmadi")
+            self.connection = None
+
+
+class EmailWorkerPool:
+    """
+    Belgilangan miqdordagi EmailWorker lar va chegaralangan navbatdan iborat pool.
+    Navbat to'lganda emailni qo'shayotgan thread kutadi (backpressure), kutish vaqti tugasa
+    email shu threadning o'zida jo'natiladi.
+    """
+    def __init__(self, workers=4, queue_size=1000, batch_size=20, put_timeout=5.0, idle_timeout=30.0):
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.batch_size = batch_size
+        self.put_timeout = put_timeout
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=1000)
+        self._sent = 0
+        self._failed = 0
+        self._inline = 0
+        self._closed = False
+        self._workers = [EmailWorker(self, i) for i in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, email):
+        """
+        Emailni jo'natish navbatiga qo'yadi.
+        Args:
+            email (EmailMessage): Jo'natiladigan email obyekti.
+        """
+        if self._closed:
+            raise RuntimeError("EmailWorkerPool allaqachon yopilgan")
+        try:
+            self.queue.put((email, time.monotonic()), timeout=self.put_timeout)
+        except queue.Full:
+            # Navbat to'la - emailni chaqiruvchi threadning o'zida jo'natamiz
+            logger.warning("Email navbati to'la (%d), email sinxron jo'natilmoqda", self.queue.qsize())
+            with self._lock:
+                self._inline += 1
+            # Worker dagi kabi xato so'rovga ko'tarilmaydi, faqat yoziladi
+            try:
+                email.send()
+            except Exception:
+                logger.exception("Emailni sinxron jo'natib bo'lmadi")
+                self.record_failure(1)
+
+    async def asubmit(self, email):
+        """
+        submit ning async varianti: navbatda joy bo'lsa email darhol qo'yiladi, aks holda kutish
+        event loop ni bloklamasligi uchun alohida threadda bajariladi.
+        """
+        if self._closed:
+            raise RuntimeError("EmailWorkerPool allaqachon yopilgan")
+        try:
+            self.queue.put_nowait((email, time.monotonic()))
+        except queue.Full:
+            await sync_to_async(self.submit, thread_sensitive=False)(email)
+
+    def record_sent(self, queued_at):
+        now = time.monotonic()
+        with self._lock:
+            self._sent += len(queued_at)
+            self._latencies.extend(now - value for value in queued_at)
+
+    def record_failure(self, count):
+        with self._lock:
+            self._failed += count
+
+    def stats(self):
+        """
+        Pool holati haqida ma'lumot qaytaradi.
+        Returns:
+            dict: navbat uzunligi, jo'natilgan/xato emaillar soni va jo'natish kechikishi (soniya).
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+            data = {
+                "queue_depth": self.queue.qsize(),
+                "sent": self._sent,
+                "failed": self._failed,
+                "sent_inline": self._inline,
+            }
+        if latencies:
+            data["latency_avg"] = sum(latencies) / len(latencies)
+            data["latency_max"] = latencies[-1]
+        return data
+
+    def shutdown(self, timeout=None):
+        """
+        Yangi emaillarni qabul qilishni to'xtatadi, navbatdagilarni jo'natib bo'lgach workerlarni yopadi.
+        Muddat tugasa kutish to'xtatiladi (workerlar daemon, jarayon chiqishiga to'sqinlik qilmaydi).
+        Args:
+            timeout (float): Umumiy kutish vaqti (soniya), None bo'lsa cheklanmaydi.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        def remaining():
+            return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+        for _ in self._workers:
+            try:
+                # Navbat to'la bo'lsa bloklanib qolmaslik uchun kutish muddat bilan cheklanadi
+                self.queue.put(_STOP, timeout=remaining())
+            except queue.Full:
+                logger.warning("Email navbati bo'shamadi, %d ta email jo'natilmay qoldi", self.queue.qsize())
+                return
+        for worker in self._workers:
+            worker.join(remaining())
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_email_pool():
+    """
+    Jarayon uchun yagona EmailWorkerPool ni qaytaradi. Fork dan keyin (masalan gunicorn preload)
+    yangi jarayonda pool qaytadan yaratiladi.
+    """
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        with _pool_lock:
+            if _pool is None or _pool_pid != pid:
+                _pool = EmailWorkerPool(
+                    workers=getattr(settings, 'EMAIL_POOL_WORKERS', 4),
+                    queue_size=getattr(settings, 'EMAIL_POOL_QUEUE_SIZE', 1000),
+                    batch_size=getattr(settings, 'EMAIL_POOL_BATCH_SIZE', 20),
+                    put_timeout=getattr(settings, 'EMAIL_POOL_PUT_TIMEOUT', 5.0),
+                    idle_timeout=getattr(settings, 'EMAIL_POOL_IDLE_TIMEOUT', 30.0),
+                )
+                _pool_pid = pid
+    return _pool
+
+
+def shutdown_email_pool(timeout=None):
+    """
+    Joriy jarayondagi poolni yopadi (navbatdagi emaillar jo'natib bo'linadi).
+    """
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None and _pool_pid == os.getpid():
+        pool.shutdown(timeout)
+
+
+atexit.register(shutdown_email_pool, 10)
@@ -0,0 +1,157 @@
+import socketserver
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from shared.benchmark import percentile, peak_rss_mb, ThreadCountSampler
+from shared.mailer import shutdown_email_pool
+from shared.utility import send_email
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """
+    SMTP protokolining jo'natish uchun yetarli qismini bajaradigan va xatlarni saqlamasdan
+    faqat qabul qilingan vaqtini yozib qo'yadigan handler.
+    """
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        self.reply("220 sink ESMTP")
+        recipients = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                break
+            command = line.decode(errors='replace').strip()
+            verb = command[:4].upper()
+            if verb == "EHLO":
+                self.reply("250-sink")
+                self.reply("250 8BITMIME")
+            elif verb == "RCPT":
+                recipients.append(command.split(":", 1)[1].strip().strip("<>"))
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b".\n", b""):
+                    pass
+                self.server.delivered(recipients)
+                recipients = []
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                break
+            else:
+                # HELO, MAIL, RSET, NOOP
+                self.reply("250 OK")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super(SMTPSink, self).__init__(("127.0.0.1", 0), SMTPSinkHandler)
+        self.lock = threading.Lock()
+        self.received = {}
+        self.connections = 0
+
+    def process_request(self, request, client_address):
+        with self.lock:
+            self.connections += 1
+        super(SMTPSink, self).process_request(request, client_address)
+
+    def delivered(self, recipients):
+        now = time.monotonic()
+        with self.lock:
+            for recipient in recipients:
+                self.received[recipient] = now
+
+    def reset(self):
+        with self.lock:
+            self.received = {}
+            self.connections = 0
+
+
+class Command(BaseCommand):
+    help = ("shared.utility.send_email yo'lini jarayon ichidagi SMTP sink ga qarshi o'sib boruvchi "
+            "parallellik bilan o'lchaydi")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=500,
+                            help="Har bir parallellik darajasida jo'natiladigan xatlar soni")
+        parser.add_argument('--concurrency', default='1,4,16,64',
+                            help="Vergul bilan ajratilgan parallel jo'natuvchilar soni")
+        parser.add_argument('--timeout', type=float, default=60,
+                            help="Barcha xatlar yetib kelishini kutish vaqti (soniya)")
+
+    def handle(self, *args, **options):
+        sink = SMTPSink()
+        threading.Thread(target=sink.serve_forever, daemon=True).start()
+        port = sink.server_address[1]
+        levels = [int(value) for value in options['concurrency'].split(',')]
+
+        self.stdout.write(f"SMTP sink 127.0.0.1:{port} da ishga tushdi")
+        self.stdout.write(
+            f"{'conc':>5} {'msgs':>6} {'msg/s':>9} {'p50 ms':>9} {'p99 ms':>9} "
+            f"{'threads':>8} {'smtp conn':>10} {'rss MB':>8}"
+        )
+        try:
+            with override_settings(
+                EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+                EMAIL_HOST='127.0.0.1', EMAIL_PORT=port,
+                EMAIL_USE_TLS=False, EMAIL_USE_SSL=False,
+                EMAIL_HOST_USER='', EMAIL_HOST_PASSWORD='',
+                EMAIL_OUTBOX=False,
+            ):
+                for level in levels:
+                    self.run_level(sink, level, options['messages'], options['timeout'])
+        finally:
+            shutdown_email_pool()
+            sink.shutdown()
+            sink.server_close()
+
+    def run_level(self, sink, concurrency, total, timeout):
+        # Har bir daraja yangi pool bilan boshlanadi
+        shutdown_email_pool()
+        sink.reset()
+        enqueued = {}
+        addresses = [f"bench-{concurrency}-{i}@example.com" for i in range(total)]
+        chunks = [addresses[i::concurrency] for i in range(concurrency)]
+
+        def produce(chunk):
+            for address in chunk:
+                enqueued[address] = time.monotonic()
+                send_email(address, "1234")
+
+        sampler = ThreadCountSampler()
+        sampler.start()
+        started = time.monotonic()
+        producers = [threading.Thread(target=produce, args=(chunk,)) for chunk in chunks]
+        for producer in producers:
+            producer.start()
+        for producer in producers:
+            producer.join()
+
+        deadline = time.monotonic() + timeout
+        while len(sink.received) < total and time.monotonic() < deadline:
+            time.sleep(0.01)
+        threads = sampler.stop()
+
+        with sink.lock:
+            received = dict(sink.received)
+            connections = sink.connections
+        if not received:
+            self.stdout.write(self.style.ERROR(f"{concurrency:>5} hech qanday xat yetib kelmadi"))
+            return
+        latencies = sorted(received[a] - enqueued[a] for a in received if a in enqueued)
+        elapsed = max(received.values()) - started
+        self.stdout.write(
+            f"{concurrency:>5} {len(received):>6} {len(received) / elapsed:>9.1f} "
+            f"{percentile(latencies, 50) * 1000:>9.2f} {percentile(latencies, 99) * 1000:>9.2f} "
+            f"{threads:>8} {connections:>10} {peak_rss_mb():>8.1f}"
+        )
+        if len(received) < total:
+            self.stdout.write(self.style.WARNING(f"{total - len(received)} ta xat vaqtida yetib kelmadi"))
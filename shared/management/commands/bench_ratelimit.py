@@ -0,0 +1,51 @@
+import multiprocessing
+import os
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from shared.ratelimit import SharedTokenBucketTable
+
+
+def _run_checks(path, slots, iterations, distinct_keys, worker):
+    table = SharedTokenBucketTable(path, slots)
+    keys = [f"bench:{worker}:{i}" for i in range(distinct_keys)]
+    started = time.perf_counter()
+    for i in range(iterations):
+        table.hit(keys[i % distinct_keys], rate=1000.0, capacity=1000.0)
+    return time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = "shared.ratelimit jadvalida bitta limit tekshiruvining narxini o'lchaydi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=100000,
+                            help="Har bir jarayondagi tekshiruvlar soni")
+        parser.add_argument('--keys', type=int, default=1000, help="Turli kalitlar soni")
+        parser.add_argument('--processes', default='1,2,4',
+                            help="Vergul bilan ajratilgan parallel jarayonlar soni")
+        parser.add_argument('--slots', type=int, default=65536, help="Jadvaldagi slotlar soni")
+
+    def handle(self, *args, **options):
+        directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+        path = os.path.join(directory, f"instagram_auth_ratelimit_bench_{os.getpid()}")
+        iterations = options['iterations']
+        self.stdout.write(f"{'proc':>5} {'checks/s':>12} {'us/check':>10}")
+        try:
+            for processes in [int(value) for value in options['processes'].split(',')]:
+                args = [(path, options['slots'], iterations, options['keys'], worker)
+                        for worker in range(processes)]
+                started = time.perf_counter()
+                with multiprocessing.get_context('fork').Pool(processes) as pool:
+                    timings = pool.starmap(_run_checks, args)
+                elapsed = time.perf_counter() - started
+                total = iterations * processes
+                self.stdout.write(
+                    f"{processes:>5} {total / elapsed:>12.0f} "
+                    f"{sum(timings) / total * 1_000_000:>10.2f}"
+                )
+        finally:
+            if os.path.exists(path):
+                os.unlink(path)
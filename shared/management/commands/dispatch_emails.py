@@ -0,0 +1,100 @@
+import time
+from datetime import timedelta
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from shared.models import EmailOutbox, PENDING, SENT, FAILED
+
+
+class Command(BaseCommand):
+    help = "EmailOutbox jadvalidagi jo'natilmagan emaillarni paketlab jo'natadi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help="Bitta tranzaksiyada olinadigan emaillar soni")
+        parser.add_argument('--max-attempts', type=int, default=5,
+                            help="Email FAILED deb belgilanishidan oldingi urinishlar soni")
+        parser.add_argument('--backoff', type=float, default=30.0,
+                            help="Birinchi xatodan keyingi kutish (soniya), har bir urinishda ikki barobar oshadi")
+        parser.add_argument('--max-backoff', type=float, default=3600.0,
+                            help="Urinishlar orasidagi eng uzun kutish (soniya)")
+        parser.add_argument('--lease', type=float, default=300.0,
+                            help="Band qilingan email shu vaqt (soniya) ichida natijasi yozilmasa qayta olinadi")
+        parser.add_argument('--loop', action='store_true',
+                            help="Navbat bo'shaganda to'xtamasdan yangi emaillarni kutish")
+        parser.add_argument('--sleep', type=float, default=1.0,
+                            help="--loop rejimida navbat bo'sh bo'lganda kutish vaqti (soniya)")
+
+    def handle(self, *args, **options):
+        connection = get_connection(fail_silently=False)
+        total = 0
+        started = time.monotonic()
+        try:
+            while True:
+                count = self.dispatch_batch(connection, options)
+                total += count
+                if count:
+                    continue
+                if not options['loop']:
+                    break
+                connection.close()
+                time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connection.close()
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} ta email {elapsed:.1f} soniyada qayta ishlandi"
+        ))
+
+    def dispatch_batch(self, connection, options):
+        """
+        Vaqti kelgan emaillarni SKIP LOCKED bilan band qiladi va tranzaksiyani darhol yakunlaydi:
+        band qilingan qatorlarning next_attempt_at i lease muddatiga suriladi, shuning uchun boshqa
+        dispatcherlar ularni olmaydi, SMTP bilan ishlash esa qulflarsiz bajariladi. Jo'natilgandan keyin
+        natija yoziladi: xato bo'lsa keyingi urinish eksponensial kechiktiriladi, urinishlar tugasa
+        email FAILED bo'ladi. Jarayon to'xtab qolsa emaillar lease tugagach qayta olinadi.
+        Returns:
+            int: Qayta ishlangan emaillar soni.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            rows = list(
+                EmailOutbox.objects.select_for_update(skip_locked=True)
+                .filter(status=PENDING, next_attempt_at__lte=now)
+                .order_by('next_attempt_at')[:options['batch_size']]
+            )
+            if not rows:
+                return 0
+            for row in rows:
+                row.attempts += 1
+                row.updated_time = now
+                row.next_attempt_at = now + timedelta(seconds=options['lease'])
+            EmailOutbox.objects.bulk_update(rows, ['attempts', 'updated_time', 'next_attempt_at'])
+
+        for row in rows:
+            try:
+                # open() ulanish allaqachon ochiq bo'lsa hech narsa qilmaydi
+                connection.open()
+                connection.send_messages([row.to_message(connection)])
+            except Exception as e:
+                row.last_error = str(e)
+                if row.attempts >= options['max_attempts']:
+                    row.status = FAILED
+                else:
+                    delay = min(options['backoff'] * 2 ** (row.attempts - 1), options['max_backoff'])
+                    row.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+                connection.close()
+            else:
+                row.status = SENT
+                row.sent_time = timezone.now()
+                row.last_error = ''
+            row.updated_time = timezone.now()
+        EmailOutbox.objects.bulk_update(
+            rows, ['status', 'last_error', 'sent_time', 'next_attempt_at', 'updated_time']
+        )
+        return len(rows)
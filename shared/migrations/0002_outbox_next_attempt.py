@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:05
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shared", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="emailoutbox",
+            name="shared_outbox_pending_idx",
+        ),
+        migrations.AddField(
+            model_name="emailoutbox",
+            name="next_attempt_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name="emailoutbox",
+            index=models.Index(
+                condition=models.Q(("status", "pending")),
+                fields=["next_attempt_at"],
+                name="shared_outbox_due_idx",
+            ),
+        ),
+    ]
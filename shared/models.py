@@ -1,6 +1,8 @@
 import uuid
 
+from django.core.mail import EmailMessage
 from django.db import models
+from django.utils import timezone
 
 # Create your models here.
 
@@ -10,4 +12,48 @@ class BaseModel(models.Model):
     updated_time = models.DateTimeField(auto_now=True)
 
     class Meta:
-        abstract = True
\ No newline at end of file
+        abstract = True
+
+
+PENDING, SENT, FAILED = ('pending', 'sent', 'failed')
+
+
+class EmailOutbox(BaseModel):
+    STATUS = (
+        (PENDING, PENDING),
+        (SENT, SENT),
+        (FAILED, FAILED)
+    )
+
+    to_email = models.EmailField()  # Qabul qiluvchi email manzili
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    content_type = models.CharField(max_length=31, default='plain')  # "plain" yoki "html"
+    status = models.CharField(max_length=31, choices=STATUS, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)  # Jo'natishga urinishlar soni
+    last_error = models.TextField(blank=True, default='')
+    sent_time = models.DateTimeField(null=True, blank=True)
+    # Keyingi urinish vaqti: xatodan keyin eksponensial kechiktiriladi, band qilingan email uchun esa lease muddati
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Dispatcher faqat vaqti kelgan jo'natilmagan emaillarni navbat bo'yicha oladi
+            models.Index(fields=['next_attempt_at'], name='shared_outbox_due_idx',
+                         condition=models.Q(status=PENDING)),
+        ]
+
+    def __str__(self):
+        return f"{self.to_email} ({self.status})"
+
+    def to_message(self, connection=None):
+        # Outbox yozuvidan jo'natishga tayyor EmailMessage obyektini yaratish
+        email = EmailMessage(
+            subject=self.subject,
+            body=self.body,
+            to=[self.to_email],
+            connection=connection
+        )
+        if self.content_type == "html":
+            email.content_subtype = 'html'
+        return email
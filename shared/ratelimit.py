@@ -0,0 +1,100 @@
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+
+from django.conf import settings
+
+# Slot: kalit xeshi (0 - bo'sh), qolgan tokenlar soni, oxirgi yangilanish vaqti (epoch)
+SLOT = struct.Struct('<Qdd')
+# Kalit uchun tekshiriladigan qo'shni slotlar soni
+PROBES = 8
+
+
+class SharedTokenBucketTable:
+    """
+    mmap qilingan fayldagi token bucket lar jadvali. Fayl /dev/shm da bo'lsa bitta serverdagi
+    barcha gunicorn workerlari bir xil hisoblagichlarni ko'radi. Jadval hajmi o'zgarmas:
+    joy qolmasa eng uzoq vaqt ishlatilmagan bucket o'rniga yoziladi.
+    """
+    def __init__(self, path, slots=65536):
+        self.path = path
+        self.slots = slots
+        self._lock = threading.Lock()
+        self._pid = None
+        self._file = None
+        self._map = None
+
+    def _open(self):
+        # Fork dan keyin faylni qayta ochamiz: flock ochiq fayl obyektiga bog'langan
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        size = self.slots * SLOT.size
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(fd).st_size < size:
+            os.ftruncate(fd, size)
+        self._file = fd
+        self._map = mmap.mmap(fd, size, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+        self._pid = pid
+
+    @staticmethod
+    def _hash(key):
+        value = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little')
+        return value or 1
+
+    def hit(self, key, rate, capacity, cost=1.0):
+        """
+        Kalitning bucketidan cost ta token oladi.
+        Args:
+            key (str): Bucket kaliti (masalan "login:ip:1.2.3.4").
+            rate (float): Soniyasiga qo'shiladigan tokenlar soni.
+            capacity (float): Bucket sig'imi (ketma-ket ruxsat etiladigan so'rovlar soni).
+            cost (float): Olinadigan tokenlar soni.
+        Returns:
+            tuple: (ruxsat berildimi, qayta urinishgacha kutish vaqti soniyada).
+        """
+        key_hash = self._hash(key)
+        start = key_hash % self.slots
+        now = time.time()
+        with self._lock:
+            self._open()
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+            try:
+                offset, tokens, updated = self._find_slot(key_hash, start, now, capacity, rate)
+                tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+                allowed = tokens >= cost
+                if allowed:
+                    tokens -= cost
+                SLOT.pack_into(self._map, offset, key_hash, tokens, now)
+            finally:
+                fcntl.flock(self._file, fcntl.LOCK_UN)
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+    def _find_slot(self, key_hash, start, now, capacity, rate):
+        # Kalitning o'z sloti, bo'sh slot yoki to'lib bo'lgan (eskirgan) bucket qidiriladi
+        oldest = None
+        for probe in range(PROBES):
+            offset = ((start + probe) % self.slots) * SLOT.size
+            slot_hash, tokens, updated = SLOT.unpack_from(self._map, offset)
+            if slot_hash == key_hash:
+                return offset, tokens, updated
+            if slot_hash == 0 or (now - updated) * rate >= capacity:
+                return offset, capacity, now
+            if oldest is None or updated < oldest[1]:
+                oldest = (offset, updated)
+        return oldest[0], capacity, now
+
+
+def _default_path():
+    directory = '/dev/shm' if os.path.isdir('/dev/shm') else '/tmp'
+    return os.path.join(directory, 'instagram_auth_ratelimit')
+
+
+rate_limit_table = SharedTokenBucketTable(
+    getattr(settings, 'SHARED_THROTTLE_PATH', None) or _default_path(),
+    getattr(settings, 'SHARED_THROTTLE_SLOTS', 65536),
+)
@@ -0,0 +1,126 @@
+import functools
+import hashlib
+import os
+import posixpath
+import re
+import tempfile
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.module_loading import import_string
+
+# Vaqtinchalik fayllar nomi nuqta bilan boshlanadi, ular hech qachon saqlangan fayl nomi bo'lmaydi
+TEMP_PREFIX = '.upload-'
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Fayllarni mijoz bergan nom bilan emas, tarkibining sha256 xeshi bilan saqlaydi va ularni
+    ichma-ich papkalarga taqsimlaydi: user_photos/ab/cd/abcd...ef.jpg. Bitta papkadagi fayllar soni
+    kichik bo'lib qoladi, bir xil tarkibli fayllar esa bir marta saqlanadi (nom tarkibdan olinadi,
+    shuning uchun mavjud nom aynan shu tarkibni bildiradi).
+    Fayllar bir nechta yozuvga tegishli bo'lishi mumkin, shuning uchun ularni faqat hech qaysi yozuv
+    ishlatmayotganda o'chirish kerak.
+    """
+    def __init__(self, depth=2, width=2, **kwargs):
+        super(ContentAddressedStorage, self).__init__(**kwargs)
+        self.depth = depth
+        self.width = width
+        self.name_pattern = re.compile(r'^(?:.*/)?((?:[0-9a-f]{%d}/){%d})([0-9a-f]{64})(?:\.\w+)?$' % (width, depth))
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.content_name(name, content)
+        # Xuddi shu tarkib avval saqlangan: diskka qayta yozilmaydi. Vaqti yangilanadi, shunda gc_photos
+        # havolasiz deb topgan, lekin hozir qayta ishlatilayotgan faylni o'chirmaydi
+        if self.exists(name):
+            try:
+                os.utime(self.path(name))
+            except FileNotFoundError:
+                return super(ContentAddressedStorage, self).save(name, content, max_length)
+            return name
+        return super(ContentAddressedStorage, self).save(name, content, max_length)
+
+    def content_name(self, name, content):
+        """
+        Fayl tarkibini bo'laklab o'qib xeshlaydi (butun fayl xotiraga olinmaydi).
+        Args:
+            name (str): Taklif qilingan nom (papkasi va kengaytmasi saqlanadi).
+            content (File): Saqlanadigan fayl.
+        Returns:
+            str: <papka>/<shardlar>/<sha256>.<kengaytma> ko'rinishidagi nom.
+        """
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content_hash = digest.hexdigest()
+        directory, basename = posixpath.split(name)
+        extension = os.path.splitext(basename)[1].lower()
+        shards = [content_hash[i * self.width:(i + 1) * self.width] for i in range(self.depth)]
+        return posixpath.join(directory, *shards, content_hash + extension)
+
+    def is_content_addressed(self, name):
+        """
+        Returns:
+            bool: Nom shu storage yaratadigan ko'rinishda va shardlari xeshga mos bo'lsa True.
+        """
+        match = self.name_pattern.match(name or '')
+        return bool(match) and match.group(1).replace('/', '') == match.group(2)[:self.depth * self.width]
+
+    def get_available_name(self, name, max_length=None):
+        # Nom tarkibdan olingan, unga suffiks qo'shilmaydi va uni qisqartirib bo'lmaydi
+        if max_length is not None and len(name) > max_length:
+            raise SuspiciousFileOperation(f"'{name}' fayl nomi {max_length} belgidan uzun")
+        return name
+
+    def _save(self, name, content):
+        """
+        Tarkib avval shu papkadagi vaqtinchalik faylga yoziladi, so'ng os.link bilan o'z nomiga
+        bog'lanadi: o'quvchilar chala yozilgan faylni ko'rmaydi, bir vaqtda bir xil faylni saqlayotgan
+        so'rovlardan faqat bittasining nusxasi qoladi.
+        """
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        if self.directory_permissions_mode is not None:
+            old_umask = os.umask(0o777 & ~self.directory_permissions_mode)
+            try:
+                os.makedirs(directory, self.directory_permissions_mode, exist_ok=True)
+            finally:
+                os.umask(old_umask)
+        else:
+            os.makedirs(directory, exist_ok=True)
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix=TEMP_PREFIX)
+        except FileNotFoundError:
+            # gc_photos bo'shagan shard papkani shu orada o'chirgan bo'lishi mumkin
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix=TEMP_PREFIX)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in content.chunks():
+                    f.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(temp_path, self.file_permissions_mode)
+            try:
+                os.link(temp_path, full_path)
+            except FileExistsError:
+                # Parallel so'rov aynan shu tarkibni allaqachon saqlagan
+                pass
+        finally:
+            os.unlink(temp_path)
+        return str(name).replace('\\', '/')
+
+
+@functools.lru_cache(maxsize=None)
+def get_photo_storage():
+    """
+    PHOTO_STORAGE sozlamasidagi storage ni qaytaradi (User.photo maydonining storage i, jarayon davomida bitta obyekt).
+    """
+    options = getattr(settings, 'PHOTO_STORAGE', {})
+    backend = import_string(options.get('BACKEND', 'shared.storage.ContentAddressedStorage'))
+    return backend(**options.get('OPTIONS', {}))
@@ -0,0 +1,86 @@
+from collections.abc import Mapping
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.throttling import BaseThrottle
+
+from shared.ratelimit import rate_limit_table
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+class SharedMemoryThrottle(BaseThrottle):
+    """
+    Bir serverdagi barcha workerlar uchun umumiy token bucket asosidagi throttle.
+    So'rov IP manzili va (agar ma'lum bo'lsa) akkaunt bo'yicha alohida cheklanadi.
+    DRF throttle larni view handleridan oldin tekshiradi, shuning uchun rad etilgan so'rov
+    parol xeshlash yoki bazaga murojaatgacha yetib bormaydi.
+    """
+    scope = None
+    # Akkaunt aniqlanadigan request.data maydonlari (foydalanuvchi autentifikatsiyadan o'tmagan bo'lsa)
+    account_fields = ()
+
+    def __init__(self):
+        self.rate, self.capacity = self.parse_rate(self.get_rate())
+        self.retry_after = None
+
+    def get_rate(self):
+        try:
+            return settings.SHARED_THROTTLE_RATES[self.scope]
+        except (AttributeError, KeyError):
+            raise ImproperlyConfigured(f"SHARED_THROTTLE_RATES da '{self.scope}' uchun limit berilmagan")
+
+    @staticmethod
+    def parse_rate(rate):
+        """
+        "10/min" ko'rinishidagi limitni (soniyasiga tokenlar, bucket sig'imi) ga aylantiradi.
+        """
+        num, period = rate.split('/')
+        num = int(num)
+        return num / PERIODS[period[0]], num
+
+    def get_account(self, request):
+        if request.user and request.user.is_authenticated:
+            return str(request.user.pk)
+        # Tana JSON obyekt bo'lmasa (masalan ro'yxat) faqat IP bo'yicha cheklanadi, xatoni serializer qaytaradi
+        if not isinstance(request.data, Mapping):
+            return None
+        for field in self.account_fields:
+            value = request.data.get(field)
+            if value:
+                return str(value).lower()
+        return None
+
+    def allow_request(self, request, view):
+        keys = [f"{self.scope}:ip:{self.get_ident(request)}"]
+        account = self.get_account(request)
+        if account:
+            keys.append(f"{self.scope}:account:{account}")
+        for key in keys:
+            allowed, retry_after = rate_limit_table.hit(key, self.rate, self.capacity)
+            if not allowed:
+                self.retry_after = retry_after
+                return False
+        return True
+
+    def wait(self):
+        return self.retry_after
+
+
+class LoginThrottle(SharedMemoryThrottle):
+    scope = 'login'
+    account_fields = ('user_input',)
+
+
+class SignUpThrottle(SharedMemoryThrottle):
+    scope = 'signup'
+    account_fields = ('email',)
+
+
+class VerifyThrottle(SharedMemoryThrottle):
+    scope = 'verify'
+
+
+class ForgotPasswordThrottle(SharedMemoryThrottle):
+    scope = 'forgot_password'
+    account_fields = ('email',)
@@ -0,0 +1,94 @@
+import io
+
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from PIL import Image, UnidentifiedImageError
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+
+_options = getattr(settings, 'UPLOAD_LIMITS', {})
+MAX_BYTES = _options.get('MAX_BYTES', 5 * 2**20)
+# Fayldan tashqari maydonlar va multipart chegaralari uchun qo'shimcha joy
+MAX_REQUEST_BYTES = _options.get('MAX_REQUEST_BYTES', MAX_BYTES + 2**20)
+MAX_PIXELS = _options.get('MAX_PIXELS', 4096 * 4096)
+MAX_SIDE = _options.get('MAX_SIDE', 8192)
+# Rasm sarlavhasi (o'lchamlari) faylning shuncha boshlang'ich baytida topilishi kerak
+HEADER_BYTES = _options.get('HEADER_BYTES', 256 * 2**10)
+IMAGE_FIELDS = tuple(_options.get('IMAGE_FIELDS', ('photo', )))
+IMAGE_FORMATS = tuple(_options.get('IMAGE_FORMATS', ('JPEG', 'PNG')))
+
+
+class UploadRejected(ValidationError):
+    """
+    Yuklanayotgan fayl cheklovlardan o'tmadi. DRF so'rov tanasini o'qishda chiqqan xatoni view ichida
+    qayta ko'taradi, shuning uchun u boshqa xatolar kabi {"success": False, "message": ...} javobiga aylanadi.
+    """
+    def __init__(self, message, status_code=status.HTTP_400_BAD_REQUEST):
+        super(UploadRejected, self).__init__({"success": False, "message": message})
+        self.status_code = status_code
+
+
+class LimitedUploadHandler(TemporaryFileUploadHandler):
+    """
+    Fayllarni hajmidan qat'i nazar xotiraga emas, vaqtinchalik faylga oqim bilan yozadi va o'qish
+    davomida cheklovlarni tekshiradi:
+      - Content-Length yoki yozilgan baytlar MAX_BYTES dan oshsa yuklash darhol to'xtatiladi;
+      - IMAGE_FIELDS dagi maydonlar uchun birinchi bo'laklardan faqat rasm sarlavhasi o'qiladi
+        (Image.open piksellarni dekodlamaydi), format va piksel o'lchamlari rasm to'liq kelishidan
+        va dekodlanishidan oldin tekshiriladi.
+    Shunday qilib worker xotirasi mijoz nima yuborishidan qat'i nazar bitta bo'lak bilan chegaralanadi.
+    """
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # Tana hajmi oldindan ma'lum bo'lsa, katta so'rov o'qilmasdan rad etiladi
+        if content_length and content_length > MAX_REQUEST_BYTES:
+            raise UploadRejected(self.too_large_message(), status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+    def new_file(self, field_name, *args, **kwargs):
+        super(LimitedUploadHandler, self).new_file(field_name, *args, **kwargs)
+        # Sarlavha aniqlangunicha yig'iladigan boshlang'ich baytlar (rasm bo'lmagan maydonlar uchun None)
+        self.header = bytearray() if field_name in IMAGE_FIELDS else None
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > MAX_BYTES:
+            self.reject(self.too_large_message(), status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        if self.header is not None:
+            self.header += raw_data
+            self.inspect_header(complete=False)
+        return super(LimitedUploadHandler, self).receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        if self.header is not None:
+            self.inspect_header(complete=True)
+        return super(LimitedUploadHandler, self).file_complete(file_size)
+
+    def inspect_header(self, complete):
+        """
+        Yig'ilgan boshlang'ich baytlardan rasm formati va o'lchamlarini aniqlaydi. Sarlavha hali to'liq
+        kelmagan bo'lsa keyingi bo'lakni kutadi.
+        Args:
+            complete (bool): Fayl to'liq o'qildimi (boshqa bo'lak kelmaydi).
+        """
+        try:
+            with Image.open(io.BytesIO(self.header), formats=IMAGE_FORMATS) as image:
+                width, height = image.size
+        except Image.DecompressionBombError:
+            self.reject("Rasm o'lchamlari juda katta", status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        except (UnidentifiedImageError, OSError, SyntaxError, ValueError):
+            if complete or len(self.header) >= HEADER_BYTES:
+                self.reject(f"Faqat {', '.join(IMAGE_FORMATS)} formatidagi rasm yuklash mumkin")
+            return
+        self.header = None
+        if width * height > MAX_PIXELS or max(width, height) > MAX_SIDE:
+            self.reject(
+                f"Rasm o'lchamlari juda katta ({width}x{height}), ko'pi bilan {MAX_PIXELS} piksel",
+                status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+
+    def reject(self, message, status_code=status.HTTP_400_BAD_REQUEST):
+        # Yarim yozilgan vaqtinchalik fayl darhol o'chiriladi
+        self.upload_interrupted()
+        raise UploadRejected(message, status_code)
+
+    @staticmethod
+    def too_large_message():
+        return f"Fayl hajmi {MAX_BYTES // 2**20} MB dan oshmasligi kerak"
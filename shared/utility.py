@@ -1,10 +1,13 @@
 import re
-import threading
 
-from django.core.mail import EmailMessage
-from django.template.loader import render_to_string
+from django.conf import settings
+from django.db import transaction
 from rest_framework.exceptions import ValidationError
 
+from shared.email_templates import render_email
+from shared.mailer import get_email_pool
+from shared.models import EmailOutbox
+
 email_regex = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,7}\b')
 username_regex = re.compile(r"^[a-zA-z0-9_.-]+$")
 def check_email_or_other(email_data):
@@ -27,26 +30,6 @@ def check_email_or_other(email_data):
         raise ValidationError(data)
 
     return email_data
-class EmailThread(threading.Thread):
-    """
-    Asinxron rejimda emailni jo'natish uchun threading.Thread dan meros olgan klass.
-    """
-    def __init__(self, email):
-        """
-        EmailThread obyektini yaratish uchun email obyektini qabul qiladi.
-        Args:
-            email (EmailMessage): Jo'natiladigan email obyekti.
-        """
-        self.email = email
-        threading.Thread.__init__(self)
-
-    def run(self):
-        """
-        Threadning ishga tushirilishi.
-        Emailni jo'natish operatsiyasini boshlash uchun email obyektini jo'natadi.
-        """
-        self.email.send()
-
 class Email:
     """
     Email jo'natish uchun yordamchi klass.
@@ -54,19 +37,39 @@ class Email:
     @staticmethod
     def send_email(data):
         """
-        Emailni yuborish uchun EmailMessage obyektini yaratadi va unga asinxron rejimda
-        jo'natish uchun EmailThread obyektini yaratib ishga tushiradi.
+        Emailni jo'natishga qo'yadi. EMAIL_OUTBOX yoqilgan bo'lsa email joriy tranzaksiya ichida
+        EmailOutbox jadvaliga yoziladi va `dispatch_emails` buyrug'i orqali jo'natiladi. Aks holda
+        tranzaksiya muvaffaqiyatli tugagach EmailWorkerPool navbatiga qo'yiladi.
         Args:
             data (dict): Email jo'natish ma'lumotlari (subject, body, to_email, content_type).
         """
-        email = EmailMessage(
+        outbox = Email.build_outbox(data)
+        if getattr(settings, 'EMAIL_OUTBOX', False):
+            outbox.save()
+        else:
+            email = outbox.to_message()
+            transaction.on_commit(lambda: get_email_pool().submit(email))
+
+    @staticmethod
+    async def asend_email(data):
+        """
+        send_email ning async viewlar uchun varianti. Async viewlar tranzaksiyasiz ishlaydi,
+        shuning uchun email darhol navbatga qo'yiladi (yoki EmailOutbox ga yoziladi).
+        """
+        outbox = Email.build_outbox(data)
+        if getattr(settings, 'EMAIL_OUTBOX', False):
+            await outbox.asave()
+        else:
+            await get_email_pool().asubmit(outbox.to_message())
+
+    @staticmethod
+    def build_outbox(data):
+        return EmailOutbox(
             subject=data['subject'],
             body=data['body'],
-            to=[data['to_email']]
+            to_email=data['to_email'],
+            content_type=data.get('content_type') or 'plain'
         )
-        if data.get('content_type') == "html":
-            email.content_subtype = 'html',
-        EmailThread(email).start()
 
 def send_email(email, code):
     """
@@ -75,18 +78,25 @@ def send_email(email, code):
         email (str): Foydalanuvchi email manzili.
         code (str): Ro'yxatdan o'tish kodi.
     """
-    html_content = render_to_string(
+    Email.send_email(activation_email(email, code))
+
+async def asend_email(email, code):
+    """
+    send_email ning async varianti.
+    """
+    await Email.asend_email(activation_email(email, code))
+
+def activation_email(email, code):
+    html_content = render_email(
         'email/authentication/activate_account.html',
         {"code": code}
     )
-    Email.send_email(
-        {
-            "subject": "Ro'yxatdan o'tish",
-            "to_email": email,
-            "body": html_content,
-            "content_type": "html"
-        }
-    )
+    return {
+        "subject": "Ro'yxatdan o'tish",
+        "to_email": email,
+        "body": html_content,
+        "content_type": "html"
+    }
 
 def check_input_type(user_input):
     if re.fullmatch(email_regex, user_input):
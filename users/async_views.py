@@ -0,0 +1,209 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.db import transaction
+from django.http import JsonResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException, NotAuthenticated, ParseError, Throttled, ValidationError
+from rest_framework.serializers import as_serializer_error
+from rest_framework_simplejwt.exceptions import TokenError
+
+from shared.throttling import LoginThrottle, SignUpThrottle, VerifyThrottle
+from shared.utility import asend_email, check_email_or_other, check_input_type, send_email
+from .authentication import CachedJWTAuthentication
+from .backends import afind_user
+from .hashers import amake_password
+from .models import User, NEW, CODE_VERIFIED
+from .tokens import UserRefreshToken, aissue_tokens
+from .verification import get_code_store
+
+
+class AsyncAPIView(View):
+    """
+    ASGI ostida thread poolga o'tmasdan ishlaydigan viewlar uchun asos. DRF viewlari sinxron,
+    shuning uchun so'rovni o'qish, JWT autentifikatsiyasi, throttle va xatolarni qaytarish shu
+    yerda DRF dagi kabi bajariladi: javoblar sinxron viewlar javoblari bilan bir xil.
+    """
+    authentication_required = False
+    throttle_classes = ()
+    # Sinxron varianti xatolarni serializer orqali qaytaradigan viewlar uchun (qiymatlar ro'yxatga o'raladi)
+    serializer_errors = False
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # DRF viewlari kabi CSRF tekshiruvisiz (autentifikatsiya faqat JWT orqali)
+        return csrf_exempt(super(AsyncAPIView, cls).as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            request.data = self.parse_body(request)
+            request.user, request.auth = AnonymousUser(), None
+            if self.authentication_required:
+                result = await CachedJWTAuthentication().aauthenticate(request)
+                if result is None:
+                    raise NotAuthenticated()
+                request.user, request.auth = result
+            self.check_throttles(request)
+            return await super(AsyncAPIView, self).dispatch(request, *args, **kwargs)
+        except APIException as exc:
+            return self.handle_exception(exc)
+
+    @staticmethod
+    def parse_body(request):
+        if request.method == 'GET':
+            return {}
+        if request.content_type == 'application/json':
+            try:
+                data = json.loads(request.body or b'{}')
+            except ValueError as e:
+                raise ParseError(f"JSON parse error - {e}")
+            # Viewlar maydonlarni data.get() bilan o'qiydi, ro'yxat yoki son kabi tanalar rad etiladi
+            if not isinstance(data, dict):
+                raise ParseError(f"JSON parse error - Expected an object, but got {type(data).__name__}")
+            return data
+        return request.POST.dict()
+
+    def check_throttles(self, request):
+        for throttle_class in self.throttle_classes:
+            throttle = throttle_class()
+            if not throttle.allow_request(request, self):
+                raise Throttled(throttle.wait())
+
+    def handle_exception(self, exc):
+        if self.serializer_errors and isinstance(exc, ValidationError):
+            data = as_serializer_error(exc)
+        elif isinstance(exc.detail, (list, dict)):
+            data = exc.detail
+        else:
+            data = {"detail": exc.detail}
+        response = JsonResponse(data, status=exc.status_code, safe=False)
+        if isinstance(exc, Throttled) and exc.wait is not None:
+            response['Retry-After'] = str(int(exc.wait) + 1)
+        if exc.status_code == 401:
+            response['WWW-Authenticate'] = CachedJWTAuthentication().authenticate_header(None)
+        return response
+
+    @classmethod
+    def require(cls, data, *fields):
+        errors = {field: ["This field is required."] for field in fields if not data.get(field)}
+        if errors:
+            raise ValidationError(errors)
+        cls.check_strings(data, *fields)
+
+    @staticmethod
+    def check_strings(data, *fields):
+        # JSON tanada son, ro'yxat yoki obyekt kelishi mumkin, ular satr kutadigan kodga yetib bormasligi kerak
+        errors = {field: ["Not a valid string."] for field in fields
+                  if data.get(field) is not None and not isinstance(data[field], str)}
+        if errors:
+            raise ValidationError(errors)
+
+
+class SignUpAsyncView(AsyncAPIView):
+    throttle_classes = (SignUpThrottle, )
+    serializer_errors = True
+
+    async def post(self, request, *args, **kwargs):
+        email = str(request.data.get('email')).lower()
+        check_email_or_other(email)
+        if await User.objects.filter(email=email).aexists():
+            raise ValidationError({
+                "success": False,
+                "message": "Bu email dan allaqachon foydalanilgan "
+            })
+        user = await sync_to_async(self.create_user)(email)
+        tokens = await aissue_tokens(user, endpoint='signup')
+        return JsonResponse({"id": str(user.id), "auth_status": user.auth_status, **tokens}, status=201)
+
+    @staticmethod
+    def create_user(email):
+        # Async ORM tranzaksiyani qo'llamaydi: foydalanuvchi, tasdiqlash kodi va email sinxron
+        # SignUpSerializer.create dagi kabi bitta tranzaksiyada yoziladi
+        with transaction.atomic():
+            user = User.objects.create(email=email)
+            code = user.create_verify_code()
+            send_email(user.email, code)
+        return user
+
+
+class VerifyAsyncView(AsyncAPIView):
+    authentication_required = True
+    throttle_classes = (VerifyThrottle, )
+
+    async def post(self, request, *args, **kwargs):
+        user = request.user
+        self.check_strings(request.data, 'code')
+        if not await get_code_store().aconsume(user, request.data.get('code')):
+            raise ValidationError({
+                "message": "Tasdiqlash kodingiz xato yoki eskirgan"
+            })
+        if user.auth_status == NEW:
+            await user.atransition_auth_status(NEW, CODE_VERIFIED)
+        tokens = await aissue_tokens(user, endpoint='verify')
+        return JsonResponse({
+            "success": True,
+            "auth_status": user.auth_status,
+            "access": tokens['access'],
+            "refresh": tokens['refresh_token']
+        })
+
+
+class GetNewVerificationAsyncView(AsyncAPIView):
+    authentication_required = True
+
+    async def get(self, request, *args, **kwargs):
+        user = request.user
+        if await get_code_store().ahas_active(user):
+            raise ValidationError({
+                "message": "Kodingiz hali ishlatish uchun yaroqli, birozdan keyin urinib ko'ring"
+            })
+        code = await user.acreate_verify_code()
+        await asend_email(user.email, code)
+        return JsonResponse({
+            "success": True,
+            "message": "Tasdiqlash kodingiz qayta yuborildi"
+        })
+
+
+class LoginAsyncView(AsyncAPIView):
+    throttle_classes = (LoginThrottle, )
+    serializer_errors = True
+
+    async def post(self, request, *args, **kwargs):
+        self.require(request.data, 'user_input', 'password')
+        user_input, password = request.data['user_input'], request.data['password']
+        check_input_type(user_input)
+        user = await afind_user(user_input)
+        if user is None:
+            # Mavjud bo'lmagan foydalanuvchi uchun ham javob vaqti bir xil bo'lishi uchun parol xeshlanadi
+            await amake_password(password)
+        if user is None or not await user.acheck_password(password) or not user.is_active:
+            raise ValidationError({
+                "success": False,
+                "message": "Kechirasiz, login yoki parolingiz xato,Ilimos qaytadan urinib ko'ring"
+            })
+        if user.auth_status in [NEW, CODE_VERIFIED]:
+            raise ValidationError({
+                "success": False,
+                "message": "Siz ro'yxatdan to'liq o'tmagansiz"
+            })
+        tokens = await aissue_tokens(user, endpoint='login')
+        return JsonResponse({**tokens, "auth_status": user.auth_status, "fullname": user.full_name})
+
+
+class LogOutAsyncView(AsyncAPIView):
+    authentication_required = True
+
+    async def post(self, request, *args, **kwargs):
+        self.require(request.data, 'refresh')
+        try:
+            # Token tekshiruvi va qora ro'yxatga yozish bazaga murojaat qiladi
+            await sync_to_async(lambda: UserRefreshToken(request.data['refresh']).blacklist())()
+        except TokenError:
+            return JsonResponse({}, status=400)
+        return JsonResponse({
+            "success": True,
+            "message": "You are loggout out"
+        }, status=206)
@@ -0,0 +1,116 @@
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .cache import local_user_cache, user_cache_key, SHARED_TTL
+from .models import User
+from .tokens import VERSION_CLAIM
+
+# Autentifikatsiya va autentifikatsiyadan keyingi viewlar uchun kerak bo'ladigan ustunlar.
+# Parol xeshi keshga tushmaydi, kerak bo'lsa Django uni alohida so'rov bilan yuklaydi.
+AUTH_USER_FIELDS = (
+    'id', 'username', 'email', 'first_name', 'last_name', 'is_active', 'is_staff', 'is_superuser',
+    'auth_status', 'user_roles', 'photo', 'photo_variants', 'token_version', 'updated_time',
+)
+
+
+def _field_names():
+    # User.from_db qiymatlarni modeldagi ustunlar tartibida kutadi
+    return [field.attname for field in User._meta.concrete_fields if field.attname in AUTH_USER_FIELDS]
+
+
+def get_cached_user(user_id):
+    """
+    Foydalanuvchini avval jarayon ichidagi LRU keshdan, keyin Django keshidan, oxirida bazadan
+    (faqat AUTH_USER_FIELDS ustunlari bilan) oladi.
+    Args:
+        user_id: Foydalanuvchi identifikatori.
+    Returns:
+        User: Har chaqiruvda yangi obyekt (keshdagi qiymatlar o'zgartirilmaydi) yoki None.
+    """
+    key = user_cache_key(user_id)
+    field_names = _field_names()
+    values = local_user_cache.get(key)
+    if values is None:
+        values = cache.get(key)
+        if values is None:
+            values = User.objects.filter(pk=user_id).values_list(*field_names).first()
+            if values is None:
+                return None
+            cache.set(key, values, SHARED_TTL)
+        local_user_cache.set(key, values)
+    return User.from_db(DEFAULT_DB_ALIAS, field_names, values)
+
+
+async def aget_cached_user(user_id):
+    """
+    get_cached_user ning async varianti (Django keshi va bazaga async API orqali murojaat qiladi).
+    """
+    key = user_cache_key(user_id)
+    field_names = _field_names()
+    values = local_user_cache.get(key)
+    if values is None:
+        values = await cache.aget(key)
+        if values is None:
+            values = await User.objects.filter(pk=user_id).values_list(*field_names).afirst()
+            if values is None:
+                return None
+            await cache.aset(key, values, SHARED_TTL)
+        local_user_cache.set(key, values)
+    return User.from_db(DEFAULT_DB_ALIAS, field_names, values)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    Foydalanuvchini har so'rovda bazadan o'qimasdan ikki darajali kesh orqali aniqlaydigan
+    JWT autentifikatsiyasi.
+    """
+    def get_user(self, validated_token):
+        # Token parol xeshi bilan tekshirilishi kerak bo'lsa standart yo'ldan foydalanamiz
+        if api_settings.CHECK_REVOKE_TOKEN:
+            return super(CachedJWTAuthentication, self).get_user(validated_token)
+        return self.check_user(validated_token, get_cached_user(self.get_user_id(validated_token)))
+
+    async def aauthenticate(self, request):
+        """
+        authenticate ning async viewlar uchun varianti.
+        Returns:
+            tuple: (user, token) yoki sarlavhada token bo'lmasa None.
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        if api_settings.CHECK_REVOKE_TOKEN:
+            user = await sync_to_async(self.get_user)(validated_token)
+        else:
+            user = self.check_user(validated_token, await aget_cached_user(self.get_user_id(validated_token)))
+        return user, validated_token
+
+    @staticmethod
+    def get_user_id(validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+    @staticmethod
+    def check_user(validated_token, user):
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        # Holat yoki rol o'zgargandan keyin chiqarilgan tokenlar yangilanishi kerak
+        if validated_token.get(VERSION_CLAIM, user.token_version) < user.token_version:
+            raise AuthenticationFailed("Token eskirgan, uni yangilang", code="token_stale")
+
+        return user
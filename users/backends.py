@@ -0,0 +1,52 @@
+from django.contrib.auth.backends import ModelBackend
+from django.db.models import Case, Value, When
+from django.db.models.functions import Lower
+
+from shared.utility import check_input_type
+from .models import User
+
+
+def _lookup(user_input):
+    field = 'email' if check_input_type(user_input) == 'email' else 'username'
+    # username faqat katta-kichik harfni hisobga olgan holda unikal: bir nechta foydalanuvchi mos kelsa
+    # kiritilgani bilan aynan bir xil yozilgani, u bo'lmasa eng birinchi ro'yxatdan o'tgani olinadi
+    return User.objects.alias(
+        lookup=Lower(field),
+        exact=Case(When(**{field: user_input}, then=Value(0)), default=Value(1)),
+    ).filter(lookup=user_input.lower()).order_by('exact', 'created_time', 'pk')
+
+
+def find_user(user_input):
+    """
+    Email yoki username bo'yicha foydalanuvchini bitta so'rov bilan topadi. Qidiruv
+    LOWER(email)/LOWER(username) bo'yicha bo'lgani uchun funksional indekslardan foydalanadi.
+    Args:
+        user_input (str): Email yoki username.
+    Returns:
+        User: Topilgan foydalanuvchi yoki None.
+    """
+    return _lookup(user_input).first()
+
+
+async def afind_user(user_input):
+    """
+    find_user ning async varianti.
+    """
+    return await _lookup(user_input).afirst()
+
+
+class EmailOrUsernameBackend(ModelBackend):
+    """
+    Foydalanuvchini email yoki username orqali autentifikatsiya qiladi.
+    """
+    def authenticate(self, request, user_input=None, password=None, **kwargs):
+        if user_input is None or password is None:
+            return None
+        user = find_user(user_input)
+        if user is None:
+            # Mavjud bo'lmagan foydalanuvchi uchun ham javob vaqti bir xil bo'lishi uchun parol xeshlanadi
+            User().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+
+from shared.cache import LocalTTLCache
+
+_options = getattr(settings, 'AUTH_USER_CACHE', {})
+local_user_cache = LocalTTLCache(
+    maxsize=_options.get('LOCAL_MAXSIZE', 10000),
+    ttl=_options.get('LOCAL_TTL', 5),
+)
+# LocMemCache har bir jarayonning o'zida turadi: invalidate_cached_user boshqa workerlardagi nusxani
+# o'chira olmaydi. Shunday kesh bilan yozuv LOCAL_TTL dan uzoq saqlansa logout, parolni tiklash va
+# bloklash boshqa workerlarda SHARED_TTL davomida kuchga kirmay qoladi
+SHARED_TTL = _options.get('SHARED_TTL', 300)
+if isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache):
+    SHARED_TTL = min(SHARED_TTL, local_user_cache.ttl)
+
+
+def user_cache_key(user_id):
+    return f"auth-user:{user_id}"
+
+
+def invalidate_cached_user(user_id):
+    """
+    Foydalanuvchi yozuvini ikkala keshdan ham o'chiradi. Boshqa jarayonlardagi lokal keshlar
+    LOCAL_TTL soniya ichida o'zi eskiradi. Django keshi umumiy bo'lmasa (LocMemCache) SHARED_TTL ham
+    LOCAL_TTL bilan cheklanadi, shunda boshqa workerlar ko'pi bilan 2 x LOCAL_TTL ichida yangilanadi.
+    """
+    key = user_cache_key(user_id)
+    local_user_cache.delete(key)
+    cache.delete(key)
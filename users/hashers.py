@@ -0,0 +1,211 @@
+import asyncio
+import base64
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    PBKDF2PasswordHasher, check_password, identify_hasher, is_password_usable, make_password,
+)
+from django.utils.crypto import constant_time_compare
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+def _pbkdf2(password, salt, iterations, digest_name):
+    # Alohida jarayonda bajariladi, shuning uchun faqat standart kutubxonadan foydalanadi
+    started = time.perf_counter()
+    value = hashlib.pbkdf2_hmac(digest_name, password.encode(), salt.encode(), iterations)
+    return base64.b64encode(value).decode('ascii').strip(), time.perf_counter() - started
+
+
+class PasswordHashPool:
+    """
+    PBKDF2 hisoblashlarini request threadidan olib, chegaralangan jarayonlar pooliga yuboradi.
+    Bir vaqtda kutayotgan vazifalar soni max_pending dan oshsa, yangi so'rovlar navbat bo'shashini kutadi.
+    workers 0 bo'lsa pool ochilmaydi va xesh chaqirgan threadning o'zida hisoblanadi.
+    """
+    def __init__(self, workers=0, max_pending=None):
+        self.workers = workers or 0
+        self.max_pending = max_pending or self.workers * 4
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._wait_total = 0.0
+        self._compute_total = 0.0
+
+    def _get_executor(self):
+        pid = os.getpid()
+        if self._executor is None or self._pid != pid:
+            with self._lock:
+                if self._executor is None or self._pid != pid:
+                    # Ko'p threadli jarayonda fork xavfli, shuning uchun forkserver ishlatiladi
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context('forkserver'),
+                    )
+                    self._pid = pid
+        return self._executor
+
+    def pbkdf2(self, password, salt, iterations, digest_name):
+        """
+        PBKDF2 xeshini hisoblaydi va base64 ko'rinishida qaytaradi.
+        """
+        if not self.workers:
+            return _pbkdf2(password, salt, iterations, digest_name)[0]
+        started = time.perf_counter()
+        with self._slots:
+            with self._lock:
+                self._pending += 1
+            try:
+                value, compute = self._get_executor().submit(
+                    _pbkdf2, password, salt, iterations, digest_name
+                ).result()
+            finally:
+                with self._lock:
+                    self._pending -= 1
+        self._record(time.perf_counter() - started, compute)
+        return value
+
+    async def apbkdf2(self, password, salt, iterations, digest_name):
+        """
+        pbkdf2 ning async varianti: natija event loop ni bloklamasdan kutiladi.
+        """
+        if not self.workers:
+            return (await sync_to_async(_pbkdf2, thread_sensitive=False)(password, salt, iterations, digest_name))[0]
+        started = time.perf_counter()
+        # Navbat to'la bo'lsa bo'sh joyni alohida threadda kutamiz
+        if not self._slots.acquire(blocking=False):
+            await sync_to_async(self._slots.acquire, thread_sensitive=False)()
+        try:
+            with self._lock:
+                self._pending += 1
+            try:
+                value, compute = await asyncio.wrap_future(self._get_executor().submit(
+                    _pbkdf2, password, salt, iterations, digest_name
+                ))
+            finally:
+                with self._lock:
+                    self._pending -= 1
+        finally:
+            self._slots.release()
+        self._record(time.perf_counter() - started, compute)
+        return value
+
+    def _record(self, total, compute):
+        with self._lock:
+            self._completed += 1
+            self._compute_total += compute
+            self._wait_total += total - compute
+
+    def stats(self):
+        """
+        Returns:
+            dict: navbatdagi vazifalar soni, bajarilganlar soni, o'rtacha kutish va hisoblash vaqti (soniya).
+        """
+        with self._lock:
+            completed = self._completed or 1
+            return {
+                "workers": self.workers,
+                "pending": self._pending,
+                "completed": self._completed,
+                "wait_avg": self._wait_total / completed,
+                "compute_avg": self._compute_total / completed,
+            }
+
+
+hash_pool = PasswordHashPool(
+    workers=getattr(settings, 'PASSWORD_HASH_WORKERS', 0),
+    max_pending=getattr(settings, 'PASSWORD_HASH_MAX_PENDING', None),
+)
+
+# Eskirgan xeshlarni login dan keyin qayta xeshlash uchun fon threadi
+_rehash_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='password-rehash')
+
+
+class PooledPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2PasswordHasher bilan bir xil formatdagi (pbkdf2_sha256) xeshlar, lekin hisoblash
+    PasswordHashPool da bajariladi. Iteratsiyalar soni PASSWORD_HASH_ITERATIONS sozlamasidan olinadi
+    (`manage.py calibrate_password_hasher` bilan tanlanadi).
+    """
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_HASH_ITERATIONS', None) or PBKDF2PasswordHasher.iterations
+
+    def encode(self, password, salt, iterations=None):
+        self._check_encode_args(password, salt)
+        iterations = iterations or self.iterations
+        hash = hash_pool.pbkdf2(password, salt, iterations, self.digest().name)
+        return "%s$%d$%s$%s" % (self.algorithm, iterations, salt, hash)
+
+
+def schedule_rehash(user, raw_password):
+    """
+    Eskirgan parametrlar bilan saqlangan parolni fonda qayta xeshlaydi. Parol shu vaqt ichida
+    o'zgargan bo'lsa yangi xesh yozilmaydi.
+    Args:
+        user (User): Login qilgan foydalanuvchi.
+        raw_password (str): Tekshirilgan parol.
+    """
+    model, pk, old_hash = type(user), user.pk, user.password
+
+    def rehash():
+        close_old_connections()
+        try:
+            model._default_manager.filter(pk=pk, password=old_hash).update(password=make_password(raw_password))
+        except Exception:
+            logger.exception("Parolni qayta xeshlab bo'lmadi")
+        finally:
+            close_old_connections()
+
+    _rehash_executor.submit(rehash)
+
+
+async def amake_password(password):
+    """
+    make_password ning async varianti (PooledPBKDF2PasswordHasher bilan).
+    """
+    hasher = PooledPBKDF2PasswordHasher()
+    salt = hasher.salt()
+    iterations = hasher.iterations
+    hash = await hash_pool.apbkdf2(password, salt, iterations, hasher.digest().name)
+    return "%s$%d$%s$%s" % (hasher.algorithm, iterations, salt, hash)
+
+
+async def acheck_password(password, encoded, setter=None):
+    """
+    check_password ning event loop ni bloklamaydigan varianti. PooledPBKDF2PasswordHasher xeshlari
+    pool da hisoblanib await qilinadi, boshqa hasherlar esa alohida threadda tekshiriladi.
+    Args:
+        password (str): Tekshiriladigan parol.
+        encoded (str): Bazadagi xesh.
+        setter (callable): Xesh eskirgan bo'lsa chaqiriladigan (sinxron) funksiya.
+    Returns:
+        bool: Parol to'g'ri bo'lsa True.
+    """
+    try:
+        hasher = identify_hasher(encoded)
+    except ValueError:
+        hasher = None
+    if password is None or not is_password_usable(encoded) or not isinstance(hasher, PooledPBKDF2PasswordHasher):
+        return await sync_to_async(check_password, thread_sensitive=False)(password, encoded, setter)
+    decoded = hasher.decode(encoded)
+    value = await hash_pool.apbkdf2(password, decoded['salt'], decoded['iterations'], hasher.digest().name)
+    is_correct = constant_time_compare(value, decoded['hash'])
+    must_update = hasher.must_update(encoded)
+    if not is_correct and must_update:
+        await sync_to_async(hasher.harden_runtime, thread_sensitive=False)(password, encoded)
+    if setter and is_correct and must_update:
+        setter(password)
+    return is_correct
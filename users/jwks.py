@@ -0,0 +1,161 @@
+import functools
+import os
+import threading
+import time
+from pathlib import Path
+
+import jwt
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.backends import TokenBackend
+from rest_framework_simplejwt.exceptions import TokenBackendError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.state import token_backend as default_token_backend
+
+# Noma'lum kid kelganda kalitlar papkasini qayta o'qish oralig'i (soniya)
+RELOAD_INTERVAL = 60
+
+
+class Keyring:
+    """
+    JWT_KEYS_DIR papkasidagi <kid>.pem yopiq kalitlari. Eng katta kid (yaratilgan vaqti) faol kalit
+    hisoblanadi va token imzolash uchun ishlatiladi, qolganlari faqat tekshirish uchun saqlanadi.
+    """
+    def __init__(self, directory, algorithm):
+        self.algorithm = algorithm
+        self.private_keys = {}
+        self.public_keys = {}
+        jws_algorithm = jwt.PyJWS().get_algorithm_by_name(algorithm)
+        for path in sorted(Path(directory).glob('*.pem')):
+            private_key = jws_algorithm.prepare_key(path.read_bytes())
+            self.private_keys[path.stem] = private_key
+            self.public_keys[path.stem] = private_key.public_key()
+        if not self.private_keys:
+            raise ImproperlyConfigured(
+                f"{algorithm} uchun {directory} papkasida kalit topilmadi. "
+                f"`manage.py rotate_jwt_key` buyrug'i bilan kalit yarating"
+            )
+        self.active_kid = max(self.private_keys)
+
+    def jwks(self):
+        """
+        Ochiq kalitlarni JWKS formatida qaytaradi.
+        """
+        jws_algorithm = jwt.PyJWS().get_algorithm_by_name(self.algorithm)
+        keys = []
+        for kid, public_key in sorted(self.public_keys.items(), reverse=True):
+            jwk = jws_algorithm.to_jwk(public_key, as_dict=True)
+            jwk.update({"kid": kid, "use": "sig", "alg": self.algorithm})
+            keys.append(jwk)
+        return {"keys": keys}
+
+
+@functools.lru_cache(maxsize=None)
+def load_keyring():
+    # Kalitlar jarayon davomida bir marta o'qiladi va parse qilinadi
+    return Keyring(settings.JWT_KEYS_DIR, api_settings.ALGORITHM)
+
+
+class RotatingTokenBackend(TokenBackend):
+    """
+    Tokenni faol kalit bilan imzolab sarlavhasiga kid yozadigan, tekshirishda esa kid bo'yicha
+    ochiq kalitni tanlaydigan backend.
+    """
+    def __init__(self, *args, **kwargs):
+        super(RotatingTokenBackend, self).__init__(*args, **kwargs)
+        self._reloaded_at = float('-inf')
+        self._reload_lock = threading.Lock()
+
+    def encode(self, payload):
+        keyring = load_keyring()
+        jwt_payload = payload.copy()
+        if self.audience is not None:
+            jwt_payload["aud"] = self.audience
+        if self.issuer is not None:
+            jwt_payload["iss"] = self.issuer
+        return jwt.encode(
+            jwt_payload,
+            keyring.private_keys[keyring.active_kid],
+            algorithm=self.algorithm,
+            headers={"kid": keyring.active_kid},
+            json_encoder=self.json_encoder,
+        )
+
+    def get_verifying_key(self, token):
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+        except jwt.InvalidTokenError as e:
+            raise TokenBackendError(_("Token is invalid")) from e
+        public_key = load_keyring().public_keys.get(kid)
+        if public_key is None and kid is not None:
+            # Kalit boshqa jarayonda yangilangan bo'lishi mumkin - papkani qayta o'qiymiz
+            self.reload()
+            public_key = load_keyring().public_keys.get(kid)
+        if public_key is None:
+            raise TokenBackendError(_("Token is invalid"))
+        return public_key
+
+    def reload(self):
+        # Noma'lum kid bilan kelgan tokenlar diskni ortiqcha o'qitmasligi uchun cheklangan
+        with self._reload_lock:
+            if time.monotonic() - self._reloaded_at < RELOAD_INTERVAL:
+                return
+            self._reloaded_at = time.monotonic()
+            load_keyring.cache_clear()
+            get_jwks_document.cache_clear()
+
+
+@functools.lru_cache(maxsize=None)
+def get_token_backend():
+    """
+    HS* algoritmlari uchun simplejwt ning standart backendini, asimmetrik algoritmlar uchun esa
+    RotatingTokenBackend ni qaytaradi.
+    """
+    if api_settings.ALGORITHM.startswith("HS"):
+        return default_token_backend
+    return RotatingTokenBackend(
+        api_settings.ALGORITHM,
+        audience=api_settings.AUDIENCE,
+        issuer=api_settings.ISSUER,
+        leeway=api_settings.LEEWAY,
+        json_encoder=api_settings.JSON_ENCODER,
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_jwks_document():
+    # HS* algoritmlarida ochiq kalit yo'q, bo'sh ro'yxat qaytariladi
+    if api_settings.ALGORITHM.startswith("HS"):
+        return {"keys": []}
+    return load_keyring().jwks()
+
+
+def generate_private_key(algorithm):
+    """
+    Algoritmga mos yangi yopiq kalit yaratadi va uni PEM (PKCS8) ko'rinishida qaytaradi.
+    """
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+
+    if algorithm.startswith(("RS", "PS")):
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    elif algorithm == "EdDSA":
+        private_key = ed25519.Ed25519PrivateKey.generate()
+    else:
+        raise ImproperlyConfigured(f"{algorithm} algoritmi uchun kalit yaratib bo'lmaydi")
+    return private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption(),
+    )
+
+
+def write_private_key(directory, kid, pem):
+    # Yopiq kalit faqat egasi o'qiy oladigan qilib yoziladi
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{kid}.pem")
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(pem)
+    return path
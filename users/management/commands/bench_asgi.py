@@ -0,0 +1,123 @@
+import asyncio
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import path
+
+from shared.benchmark import percentile, ThreadCountSampler
+from shared.throttling import SharedMemoryThrottle
+from users.async_views import LoginAsyncView, SignUpAsyncView
+from users.models import User, DONE
+from users.tokens import outstanding_ledger
+from users.views import CreateUserView, LoginView
+
+# Benchmark davomida ROOT_URLCONF sifatida shu modul ishlatiladi
+urlpatterns = [
+    path('sync/login/', LoginView.as_view()),
+    path('async/login/', LoginAsyncView.as_view()),
+    path('sync/signup/', CreateUserView.as_view()),
+    path('async/signup/', SignUpAsyncView.as_view()),
+]
+
+# (server interfeysi, viewlar)
+MODES = (("wsgi", "sync"), ("asgi", "sync"), ("asgi", "async"))
+EMAIL_PREFIX = "bench-asgi-"
+
+
+class Command(BaseCommand):
+    help = ("Login yoki signup endpointining o'tkazuvchanligini WSGI (sinxron viewlar, thread pool), ASGI "
+            "(sinxron viewlar) va ASGI (async viewlar) rejimlarida o'sib boruvchi parallellik bilan o'lchaydi")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoint', choices=('login', 'signup'), default='login')
+        parser.add_argument('--requests', type=int, default=1000,
+                            help="Har bir rejim va parallellik darajasidagi so'rovlar soni")
+        parser.add_argument('--concurrency', default='16,64,256',
+                            help="Vergul bilan ajratilgan parallel so'rovlar soni")
+        parser.add_argument('--hash-iterations', type=int, default=1000,
+                            help="Benchmark davomidagi PBKDF2 iteratsiyalari (so'rov yo'lini o'lchash uchun kichik)")
+
+    def handle(self, *args, **options):
+        levels = [int(value) for value in options['concurrency'].split(',')]
+        self.stdout.write(
+            f"{'rejim':>11} {'conc':>5} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'xato':>6} {'threads':>8}"
+        )
+        try:
+            with override_settings(
+                ROOT_URLCONF=__name__,
+                PASSWORD_HASH_ITERATIONS=options['hash_iterations'],
+                EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+                EMAIL_OUTBOX=False,
+            ), mock.patch.object(SharedMemoryThrottle, 'allow_request', return_value=True):
+                password = uuid.uuid4().hex
+                user = User(email=f"{EMAIL_PREFIX}{uuid.uuid4().hex}@example.com", auth_status=DONE)
+                user.set_password(password)
+                user.save()
+                for level in levels:
+                    for interface, views in MODES:
+                        payloads = self.payloads(options['endpoint'], options['requests'], user, password)
+                        url = f"/{views}/{options['endpoint']}/"
+                        self.run_level(interface, views, url, payloads, level)
+        finally:
+            # Bufer dagi OutstandingToken yozuvlari foydalanuvchilar o'chirilishidan oldin yoziladi
+            outstanding_ledger.flush()
+            User.objects.filter(email__startswith=EMAIL_PREFIX).delete()
+
+    @staticmethod
+    def payloads(endpoint, count, user, password):
+        if endpoint == 'login':
+            return [{'user_input': user.email, 'password': password}] * count
+        return [{'email': f"{EMAIL_PREFIX}{uuid.uuid4().hex}@example.com"} for _ in range(count)]
+
+    def run_level(self, interface, views, url, payloads, concurrency):
+        sampler = ThreadCountSampler()
+        sampler.start()
+        started = time.perf_counter()
+        if interface == "wsgi":
+            results = self.run_wsgi(url, payloads, concurrency)
+        else:
+            results = asyncio.run(self.run_asgi(url, payloads, concurrency))
+        elapsed = time.perf_counter() - started
+        threads = sampler.stop()
+        latencies = sorted(latency for latency, _ in results)
+        errors = sum(1 for _, status in results if status >= 400)
+        self.stdout.write(
+            f"{interface + '/' + views:>11} {concurrency:>5} {len(results) / elapsed:>9.1f} "
+            f"{percentile(latencies, 50) * 1000:>9.2f} {percentile(latencies, 99) * 1000:>9.2f} "
+            f"{errors:>6} {threads:>8}"
+        )
+
+    @staticmethod
+    def run_wsgi(url, payloads, concurrency):
+        # Har bir worker thread o'z Client (WSGIHandler) obyektidan foydalanadi
+        local = threading.local()
+
+        def request(payload):
+            client = getattr(local, 'client', None)
+            if client is None:
+                client = local.client = Client()
+            started = time.perf_counter()
+            response = client.post(url, payload)
+            return time.perf_counter() - started, response.status_code
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            return list(executor.map(request, payloads))
+
+    @staticmethod
+    async def run_asgi(url, payloads, concurrency):
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def request(payload):
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post(url, payload)
+                return time.perf_counter() - started, response.status_code
+
+        return await asyncio.gather(*(request(payload) for payload in payloads))
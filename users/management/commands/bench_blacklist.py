@@ -0,0 +1,69 @@
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken, BlacklistedToken
+
+from users.models import User
+from users.serializers import LoginRefreshSerializer
+from users.tokens import blacklist_index
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ("Refresh token yangilash tezligini qora ro'yxat indeksi bilan va usiz o'lchaydi. "
+            "Barcha test ma'lumotlari oxirida bekor qilinadi")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--blacklisted', type=int, default=10000,
+                            help="Qora ro'yxatga qo'shiladigan tokenlar soni")
+        parser.add_argument('--iterations', type=int, default=1000,
+                            help="Har bir rejimdagi refresh so'rovlari soni")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options['blacklisted'], options['iterations'])
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            blacklist_index.enabled = True
+            blacklist_index.refresh(force=True)
+
+    def run(self, blacklisted, iterations):
+        suffix = uuid.uuid4().hex[:12]
+        user = User.objects.create(email=f"bench-{suffix}@example.com", username=f"bench-{suffix}")
+        now = timezone.now()
+        outstanding = OutstandingToken.objects.bulk_create([
+            OutstandingToken(user=user, jti=uuid.uuid4().hex, token='', created_at=now,
+                             expires_at=now + timedelta(days=1))
+            for _ in range(blacklisted)
+        ], batch_size=1000)
+        BlacklistedToken.objects.bulk_create(
+            [BlacklistedToken(token=token) for token in outstanding], batch_size=1000
+        )
+        refresh = user.token(endpoint='bench')['refresh_token']
+
+        self.stdout.write(f"Qora ro'yxatda {blacklisted} ta token, {iterations} ta refresh")
+        self.stdout.write(f"{'rejim':>10} {'refresh/s':>10} {'ms/refresh':>11} {'query/refresh':>14}")
+        for label, enabled in (("DB", False), ("indeks", True)):
+            blacklist_index.enabled = enabled
+            blacklist_index.refresh(force=True)
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                for _ in range(iterations):
+                    serializer = LoginRefreshSerializer(data={'refresh': refresh})
+                    serializer.is_valid(raise_exception=True)
+                elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{label:>10} {iterations / elapsed:>10.1f} {elapsed / iterations * 1000:>11.3f} "
+                f"{len(queries) / iterations:>14.2f}"
+            )
@@ -0,0 +1,92 @@
+import random
+import time
+import uuid
+from unittest import mock
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from shared.benchmark import percentile
+from users import models
+from users.models import User
+
+
+class Rollback(Exception):
+    pass
+
+
+def legacy_check_username(self):
+    # Avvalgi usul: har bir nomzod uchun exists() so'rovi
+    if not self.username:
+        temp_username = f"instagram-{uuid.uuid4().__str__().split('-')[-1]}"
+        while User.objects.filter(username=temp_username).exists():
+            temp_username = f"{temp_username}{random.randint(0, 9)}"
+        self.username = temp_username
+    return False
+
+
+class Command(BaseCommand):
+    help = ("Vaqtinchalik username yaratishni eski (exists() sikli) va yangi (unique + qayta INSERT) "
+            "usullarda o'lchaydi. Barcha test ma'lumotlari oxirida bekor qilinadi")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000000,
+                            help="Oldindan jadvalga qo'shiladigan foydalanuvchilar soni")
+        parser.add_argument('--iterations', type=int, default=1000,
+                            help="Har bir usulda yaratiladigan foydalanuvchilar soni")
+        parser.add_argument('--collide', action='store_true',
+                            help="Yangi usulda birinchi nomzod doim band bo'lgan holatni o'lchash")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options['users'], options['iterations'], options['collide'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, count):
+        started = time.perf_counter()
+        batch = 10000
+        for offset in range(0, count, batch):
+            User.objects.bulk_create([
+                # bulk_create save() ni chaqirmaydi, parol xeshlanmaydi
+                User(username=models.generate_username(), email=f"seed-{uuid.uuid4().hex}@example.com",
+                     password='!')
+                for _ in range(min(batch, count - offset))
+            ], batch_size=batch)
+        self.stdout.write(f"{count} ta foydalanuvchi {time.perf_counter() - started:.1f} soniyada qo'shildi")
+
+    def run(self, users, iterations, collide):
+        self.seed(users)
+        taken = User.objects.values_list('username', flat=True).first()
+        # Parol bir marta xeshlanadi, o'lchovga faqat username va INSERT kiradi
+        password = make_password(uuid.uuid4().hex)
+        self.stdout.write(f"{'usul':>10} {'ms/insert':>10} {'p99 ms':>8} {'query/insert':>13}")
+        for label in ("eski", "yangi"):
+            patches = []
+            if label == "eski":
+                patches.append(mock.patch.object(User, 'check_username', legacy_check_username))
+            elif collide:
+                real_generate = models.generate_username
+                candidates = (name for _ in range(iterations) for name in (taken, real_generate()))
+                patches.append(mock.patch.object(models, 'generate_username', lambda: next(candidates)))
+            for patch in patches:
+                patch.start()
+            timings = []
+            try:
+                with CaptureQueriesContext(connection) as queries:
+                    for _ in range(iterations):
+                        started = time.perf_counter()
+                        User.objects.create(email=f"bench-{uuid.uuid4().hex}@example.com", password=password)
+                        timings.append(time.perf_counter() - started)
+            finally:
+                for patch in patches:
+                    patch.stop()
+            timings.sort()
+            self.stdout.write(
+                f"{label:>10} {sum(timings) / iterations * 1000:>10.3f} {percentile(timings, 99) * 1000:>8.3f} "
+                f"{len(queries) / iterations:>13.2f}"
+            )
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.models import User
+from users.photos import process_photo
+
+
+class Command(BaseCommand):
+    help = "Variantlari hali yaratilmagan profil rasmlari uchun kichraytirilgan variantlarni yaratadi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help="Variantlari bor rasmlarni ham qayta ishlash (masalan PHOTO_VARIANTS o'zgarganda)")
+
+    def handle(self, *args, **options):
+        users = User.objects.exclude(photo='').exclude(photo__isnull=True)
+        if not options['all']:
+            users = users.filter(photo_variants={})
+        started = time.monotonic()
+        count = 0
+        for user_id, photo in users.order_by('pk').values_list('pk', 'photo').iterator():
+            process_photo(user_id, photo)
+            count += 1
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f"{count} ta rasm {elapsed:.1f} soniyada qayta ishlandi"))
@@ -0,0 +1,49 @@
+import hashlib
+import os
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = ("Joriy serverda bitta PBKDF2 xeshi berilgan vaqtga sig'adigan iteratsiyalar sonini tanlaydi "
+            "va PASSWORD_HASH_ITERATIONS uchun qiymat taklif qiladi")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target-ms', type=float, default=250,
+                            help="Bitta xesh uchun ajratilgan vaqt (millisekund)")
+        parser.add_argument('--samples', type=int, default=5,
+                            help="Har bir o'lchovdagi takrorlashlar soni (mediana olinadi)")
+        parser.add_argument('--min-iterations', type=int, default=100_000,
+                            help="Xavfsizlik uchun taklif qilinadigan eng kichik qiymat")
+
+    def handle(self, *args, **options):
+        target = options['target_ms'] / 1000
+        current = getattr(settings, 'PASSWORD_HASH_ITERATIONS', None) or PBKDF2PasswordHasher.iterations
+
+        # Avval kichik son bilan o'lchab, vaqt iteratsiyalarga chiziqli bog'liqligidan foydalanamiz
+        iterations = 100_000
+        elapsed = self.measure(iterations, options['samples'])
+        iterations = max(options['min_iterations'], int(iterations * target / elapsed) // 10_000 * 10_000)
+        elapsed = self.measure(iterations, options['samples'])
+
+        self.stdout.write(f"CPU lar soni: {os.cpu_count()}")
+        self.stdout.write(f"Joriy qiymat: {current} iteratsiya ({self.measure(current, 1) * 1000:.0f} ms)")
+        self.stdout.write(f"Taklif: {iterations} iteratsiya ({elapsed * 1000:.0f} ms)")
+        self.stdout.write(self.style.SUCCESS(f"PASSWORD_HASH_ITERATIONS={iterations}"))
+        if iterations != current:
+            self.stdout.write(
+                "Qiymat o'zgartirilgach eski xeshlar foydalanuvchi login qilganda fonda qayta xeshlanadi"
+            )
+
+    @staticmethod
+    def measure(iterations, samples):
+        timings = []
+        for _ in range(samples):
+            started = time.perf_counter()
+            hashlib.pbkdf2_hmac('sha256', b'calibration-password', b'calibration-salt', iterations)
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        return timings[len(timings) // 2]
@@ -0,0 +1,213 @@
+import heapq
+import os
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from shared.storage import get_photo_storage
+from users.models import User
+
+# Ikkala oqim ham baytlar bo'yicha tartiblanadi (Python dagi str tartibi bilan bir xil)
+REFERENCES_SQL = {
+    'postgresql': (
+        "SELECT {photo} FROM {table} WHERE {photo} IS NOT NULL AND {photo} <> '' "
+        "UNION "
+        "SELECT f.value FROM {table} u "
+        "CROSS JOIN LATERAL jsonb_each(u.{variants}) s "
+        "CROSS JOIN LATERAL jsonb_each_text(s.value) f "
+        "ORDER BY 1 COLLATE \"C\""
+    ),
+    'sqlite': (
+        "SELECT {photo} FROM {table} WHERE {photo} IS NOT NULL AND {photo} <> '' "
+        "UNION "
+        "SELECT f.value FROM {table} u, json_each(u.{variants}) s, json_each(s.value) f "
+        "ORDER BY 1"
+    ),
+}
+
+
+class Command(BaseCommand):
+    """
+    Hech bir foydalanuvchi ishlatmayotgan rasm fayllarini (eski rasmlar, variantlar, ko'chirishdan
+    qolgan nusxalar) o'chiradi. Storage papkasi os.scandir bilan tartiblangan holda aylanib chiqiladi,
+    bazadagi nomlar (User.photo va photo_variants) esa server tomonidagi kursor orqali xuddi shu
+    tartibda bo'laklab o'qiladi va ikkala oqim merge-join qilinadi. Katta papkalar (masalan eski tekis
+    user_photos/) --run-size nomdan iborat tartiblangan bo'laklarga ajratilib vaqtinchalik fayllarga
+    yoziladi va heapq.merge bilan birlashtiriladi. Xotirada papka chuqurligi x --run-size nom va o'chirish
+    paketi turadi, shuning uchun fayllar soni o'n millionlab bo'lsa ham xotira o'smaydi. Bo'shab qolgan
+    shard papkalar ham o'chiriladi.
+    """
+    help = "Bazada havolasi qolmagan profil rasmi fayllarini paketlab o'chiradi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Fayllarni o'chirmasdan faqat ro'yxat va hajmini chiqarish")
+        parser.add_argument('--min-age', type=int, default=3600,
+                            help="Shundan (soniya) yangi fayllarga tegilmaydi: yuklanib hali bazaga yozilmagan "
+                                 "rasmlar va yaratilayotgan variantlar uchun")
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Bitta paketda o'chiriladigan fayllar soni")
+        parser.add_argument('--sleep', type=float, default=0.1,
+                            help="Paketlar orasidagi kutish vaqti (soniya), diskni band qilib qo'ymaslik uchun")
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help="Bazadan bir martada o'qiladigan nomlar soni")
+        parser.add_argument('--run-size', type=int, default=100000,
+                            help="Papka ro'yxatidan xotirada tartiblanadigan nomlar soni, kattaroq papkalar "
+                                 "vaqtinchalik fayllar orqali tartiblanadi")
+
+    def handle(self, *args, **options):
+        if connection.vendor not in REFERENCES_SQL:
+            raise CommandError(f"{connection.vendor} bazasi qo'llab-quvvatlanmaydi (faqat PostgreSQL va SQLite)")
+        self.storage = get_photo_storage()
+        try:
+            root = self.storage.path(User._meta.get_field('photo').upload_to)
+        except NotImplementedError:
+            raise CommandError("PHOTO_STORAGE lokal fayl tizimidagi storage bo'lishi kerak")
+        self.root = root
+        self.dry_run = options['dry_run']
+        self.min_age = options['min_age']
+        self.run_size = options['run_size']
+        started = time.monotonic()
+        scanned = kept = young = 0
+        self.deleted = self.freed = self.removed_dirs = 0
+        batch = []
+        references = self.references(options['chunk_size'])
+        reference = next(references, None)
+        for name, path in self.walk(root):
+            scanned += 1
+            while reference is not None and reference < name:
+                reference = next(references, None)
+            if reference == name:
+                kept += 1
+                continue
+            try:
+                if os.stat(path, follow_symlinks=False).st_mtime > time.time() - self.min_age:
+                    young += 1
+                    continue
+            except FileNotFoundError:
+                continue
+            batch.append(name)
+            if len(batch) >= options['batch_size']:
+                self.delete(batch)
+                batch = []
+                time.sleep(options['sleep'])
+        if batch:
+            self.delete(batch)
+        elapsed = time.monotonic() - started
+        action = "o'chiriladi" if self.dry_run else "o'chirildi"
+        self.stdout.write(self.style.SUCCESS(
+            f"{scanned} ta fayl tekshirildi: {kept} tasi ishlatilmoqda, {young} tasi juda yangi, "
+            f"{self.deleted} tasi {action} ({self.freed / 2**20:.1f} MB, {elapsed:.1f} soniya), "
+            f"{self.removed_dirs} ta bo'sh papka o'chirildi"
+        ))
+
+    def references(self, chunk_size):
+        """
+        Bazadagi barcha rasm va variant nomlarini takrorlanmasdan, tartiblangan holda bo'laklab qaytaradi.
+        Tartib buzilsa (baza collation i kutilgandek bo'lmasa) ishlatilayotgan fayllar o'chib ketmasligi
+        uchun buyruq to'xtatiladi.
+        """
+        sql = REFERENCES_SQL[connection.vendor].format(
+            table=connection.ops.quote_name(User._meta.db_table),
+            photo=connection.ops.quote_name(User._meta.get_field('photo').column),
+            variants=connection.ops.quote_name(User._meta.get_field('photo_variants').column),
+        )
+        previous = None
+        with connection.chunked_cursor() as cursor:
+            cursor.execute(sql)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for (name, ) in rows:
+                    if previous is not None and name < previous:
+                        raise CommandError("Bazadan kelgan nomlar tartiblanmagan, hech narsa o'chirilmaydi")
+                    previous = name
+                    yield name
+
+    def walk(self, path):
+        """
+        Papkani rekursiv aylanib chiqib fayllarni storage dagi nomi bo'yicha tartiblangan holda qaytaradi.
+        Yields:
+            tuple: (storage dagi nom, to'liq yo'l).
+        """
+        for key in self.sorted_entries(path):
+            child = os.path.join(path, key.rstrip('/'))
+            if key.endswith('/'):
+                yield from self.walk(child)
+            else:
+                yield os.path.relpath(child, self.storage.location).replace(os.sep, '/'), child
+
+    def sorted_entries(self, path):
+        """
+        Papkadagi fayl va papkalar nomini tartiblangan holda qaytaradi. Papka nomiga "/" qo'shib
+        tartiblanadi, shunda to'liq nomlar tartibi bazadagi tartib bilan bir xil bo'ladi. Nuqta bilan
+        boshlanadigan (yozilayotgan vaqtinchalik) fayllar o'tkazib yuboriladi. Ro'yxat --run-size dan
+        katta bo'lsa tartiblangan bo'laklar vaqtinchalik fayllarga yoziladi va oqim sifatida birlashtiriladi.
+        """
+        runs = []
+        try:
+            run = []
+            try:
+                with os.scandir(path) as iterator:
+                    for entry in iterator:
+                        # Qatorlarga bo'lib yoziladi, shuning uchun nomida yangi qator bor fayllarga tegilmaydi
+                        if entry.name.startswith('.') or '\n' in entry.name:
+                            continue
+                        if entry.is_dir(follow_symlinks=False):
+                            run.append(entry.name + '/')
+                        elif entry.is_file(follow_symlinks=False):
+                            run.append(entry.name)
+                        if len(run) >= self.run_size:
+                            runs.append(self.spill(run))
+                            run = []
+            except FileNotFoundError:
+                # Papka ro'yxat olinishidan oldin o'chirilgan
+                return
+            run.sort()
+            yield from heapq.merge(run, *((line.rstrip('\n') for line in f) for f in runs))
+        finally:
+            for f in runs:
+                f.close()
+
+    @staticmethod
+    def spill(names):
+        names.sort()
+        f = tempfile.TemporaryFile('w+', encoding='utf-8', errors='surrogateescape')
+        f.writelines(name + '\n' for name in names)
+        f.seek(0)
+        return f
+
+    def delete(self, names):
+        parents = set()
+        for name in names:
+            path = self.storage.path(name)
+            try:
+                stat = os.stat(path)
+                # Tekshiruvdan keyin fayl qayta ishlatilgan bo'lishi mumkin (bir xil rasm qayta yuklansa
+                # storage uning vaqtini yangilaydi)
+                if stat.st_mtime > time.time() - self.min_age:
+                    continue
+                if self.dry_run:
+                    self.stdout.write(name)
+                else:
+                    os.remove(path)
+                    parents.add(os.path.dirname(path))
+            except FileNotFoundError:
+                continue
+            self.deleted += 1
+            self.freed += stat.st_size
+        for directory in parents:
+            self.remove_empty_dirs(directory)
+
+    def remove_empty_dirs(self, directory):
+        # Bo'shagan shard papkalar ildizgacha yuqoriga qarab o'chiriladi, ildizning o'zi qoladi
+        while os.path.commonpath([directory, self.root]) == self.root and directory != self.root:
+            try:
+                os.rmdir(directory)
+            except OSError:
+                return
+            self.removed_dirs += 1
+            directory = os.path.dirname(directory)
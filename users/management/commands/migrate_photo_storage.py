@@ -0,0 +1,91 @@
+import time
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from shared.storage import get_photo_storage
+from users.cache import invalidate_cached_user
+from users.models import User
+
+
+class Command(BaseCommand):
+    """
+    Tekis user_photos/ papkasidagi eski fayllarni (asl rasm va variantlar) PHOTO_STORAGE ga ko'chiradi.
+    Fayllar bo'laklab o'qiladi, foydalanuvchilar pk bo'yicha paketlab olinadi. Bazadagi nomlar
+    rasm shu orada almashtirilmagan bo'lsagina yangilanadi, eski fayllar esa shundan keyin o'chiriladi.
+    Buyruqni qayta ishga tushirish xavfsiz: ko'chirilgan rasmlar o'tkazib yuboriladi.
+    """
+    help = "Profil rasmlarini kontent manzilli (sha256, papkalarga taqsimlangan) storage ga ko'chiradi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200,
+                            help="Bitta paketda olinadigan foydalanuvchilar soni")
+        parser.add_argument('--sleep', type=float, default=0.05,
+                            help="Paketlar orasidagi kutish vaqti (soniya), disk va baza uchun")
+        parser.add_argument('--keep-originals', action='store_true',
+                            help="Eski fayllarni o'chirmaslik")
+
+    def handle(self, *args, **options):
+        self.storage = get_photo_storage()
+        self.keep_originals = options['keep_originals']
+        started = time.monotonic()
+        moved = skipped = 0
+        last_pk = None
+        users = User.objects.exclude(photo='').exclude(photo__isnull=True).order_by('pk')
+        while True:
+            batch = users if last_pk is None else users.filter(pk__gt=last_pk)
+            rows = list(batch.values_list('pk', 'photo', 'photo_variants')[:options['batch_size']])
+            if not rows:
+                break
+            for user_id, photo, variants in rows:
+                if self.migrate_user(user_id, photo, variants or {}):
+                    moved += 1
+                else:
+                    skipped += 1
+            last_pk = rows[-1][0]
+            if len(rows) < options['batch_size']:
+                break
+            time.sleep(options['sleep'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{moved} ta rasm ko'chirildi, {skipped} tasi o'tkazib yuborildi ({elapsed:.1f} soniya)"
+        ))
+
+    def migrate_user(self, user_id, photo, variants):
+        """
+        Foydalanuvchining asl rasmi va variantlarini ko'chiradi.
+        Returns:
+            bool: Bazadagi nomlar yangilangan bo'lsa True.
+        """
+        if self.storage.is_content_addressed(photo) and all(
+            self.storage.is_content_addressed(name) for formats in variants.values() for name in formats.values()
+        ):
+            return False
+        if not default_storage.exists(photo):
+            self.stderr.write(f"{user_id}: {photo} fayli topilmadi")
+            return False
+        renamed = {photo: self.copy(photo)}
+        new_variants = {}
+        for size, formats in variants.items():
+            for image_format, name in formats.items():
+                # Topilmagan variant tashlab ketiladi, uni build_photo_variants qayta yaratadi
+                if default_storage.exists(name):
+                    renamed[name] = self.copy(name)
+                    new_variants.setdefault(size, {})[image_format] = renamed[name]
+        if not User.objects.filter(pk=user_id, photo=photo).update(
+            photo=renamed[photo], photo_variants=new_variants
+        ):
+            # Rasm shu orada almashtirilgan, ko'chirilgan nusxalar hech kimga tegishli bo'lmay qoladi
+            return False
+        invalidate_cached_user(user_id)
+        if not self.keep_originals:
+            for old, new in renamed.items():
+                if old != new:
+                    default_storage.delete(old)
+        return True
+
+    def copy(self, name):
+        if self.storage.is_content_addressed(name):
+            return name
+        with default_storage.open(name) as f:
+            return self.storage.save(name, f)
@@ -0,0 +1,119 @@
+import re
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from users.models import UserConfirmation
+
+PARTITION_SUFFIX = re.compile(r'_p(\d{8})$')
+
+
+class Command(BaseCommand):
+    """
+    PostgreSQL da users_userconfirmation jadvali expiration_time bo'yicha kunlik bo'laklarga
+    (PARTITION BY RANGE (expiration_time)) ajratilgan bo'lsa, buyruq oldinga bo'laklar yaratadi va
+    to'liq eskirgan bo'laklarni butunligicha DROP qiladi. Bo'laklar nomi <jadval>_pYYYYMMDD ko'rinishida
+    bo'ladi. Partitsiyalangan jadvalda primary key (id, expiration_time) bo'lishi kerakligi sababli
+    jadvalni o'zgartirish migratsiya bilan emas, qo'lda bajariladi.
+    """
+    help = "Muddati o'tgan tasdiqlash kodlarini kichik paketlarda o'chiradi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, default=60,
+                            help="Muddati shuncha daqiqa oldin tugagan kodlar o'chiriladi")
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Bitta DELETE so'rovida o'chiriladigan qatorlar soni")
+        parser.add_argument('--sleep', type=float, default=0.05,
+                            help="Paketlar orasidagi kutish vaqti (soniya), replika va boshqa so'rovlar uchun")
+        parser.add_argument('--partition-ahead', type=int, default=7,
+                            help="Partitsiyalangan jadval uchun oldindan yaratiladigan kunlik bo'laklar soni")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(minutes=options['older_than'])
+        started = time.monotonic()
+        if self.is_partitioned():
+            self.create_partitions(options['partition_ahead'])
+            dropped = self.drop_partitions(cutoff)
+            self.stdout.write(f"{dropped} ta eski bo'lak o'chirildi")
+        deleted = self.purge(cutoff, options['batch_size'], options['sleep'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{deleted} ta tasdiqlash kodi {elapsed:.1f} soniyada o'chirildi"
+        ))
+
+    def purge(self, cutoff, batch_size, sleep):
+        """
+        Qatorlarni pk bo'yicha paketlab o'chiradi. Har bir DELETE alohida tranzaksiyada bajariladi,
+        shuning uchun qulflar qisqa vaqt ushlanadi va jadval uzoq vaqt band bo'lmaydi.
+        Returns:
+            int: O'chirilgan qatorlar soni.
+        """
+        total = 0
+        expired = UserConfirmation.objects.filter(expiration_time__lt=cutoff)
+        while True:
+            ids = list(expired.values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            # UserConfirmation ga bog'langan modellar yo'q, shuning uchun bitta DELETE so'rovi bajariladi
+            deleted, _ = UserConfirmation.objects.filter(pk__in=ids).delete()
+            total += deleted
+            if len(ids) < batch_size:
+                break
+            time.sleep(sleep)
+        return total
+
+    @staticmethod
+    def is_partitioned():
+        if connection.vendor != 'postgresql':
+            return False
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)",
+                [UserConfirmation._meta.db_table],
+            )
+            return cursor.fetchone() is not None
+
+    def create_partitions(self, days):
+        table = UserConfirmation._meta.db_table
+        today = timezone.now().date()
+        with connection.cursor() as cursor:
+            for offset in range(days + 1):
+                day = today + timedelta(days=offset)
+                cursor.execute(
+                    "CREATE TABLE IF NOT EXISTS {partition} PARTITION OF {table} "
+                    "FOR VALUES FROM ('{start}') TO ('{end}')".format(
+                        partition=connection.ops.quote_name(f"{table}_p{day:%Y%m%d}"),
+                        table=connection.ops.quote_name(table),
+                        start=f"{day.isoformat()} 00:00:00+00",
+                        end=f"{(day + timedelta(days=1)).isoformat()} 00:00:00+00",
+                    )
+                )
+
+    def drop_partitions(self, cutoff):
+        """
+        Yuqori chegarasi cutoff dan oldin bo'lgan bo'laklarni DROP qiladi.
+        Returns:
+            int: O'chirilgan bo'laklar soni.
+        """
+        table = UserConfirmation._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = to_regclass(%s)",
+                [table],
+            )
+            partitions = [row[0] for row in cursor.fetchall()]
+            dropped = 0
+            for name in partitions:
+                match = PARTITION_SUFFIX.search(name)
+                if not match:
+                    continue
+                end = datetime.strptime(match.group(1), '%Y%m%d').date() + timedelta(days=1)
+                if end > cutoff.date():
+                    continue
+                cursor.execute(f"DROP TABLE {connection.ops.quote_name(name)}")
+                dropped += 1
+        return dropped
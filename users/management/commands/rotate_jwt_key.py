@@ -0,0 +1,41 @@
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.settings import api_settings
+
+from users.jwks import generate_private_key, write_private_key
+
+
+class Command(BaseCommand):
+    help = ("JWT_KEYS_DIR papkasiga yangi imzolash kalitini qo'shadi. Yangi kalit jarayonlar qayta "
+            "ishga tushgach faol bo'ladi, eskilari tokenlarni tekshirish uchun qoladi")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep', type=int, default=3,
+                            help="Yoshidan qat'i nazar saqlab qolinadigan eng yangi kalitlar soni (yangi kalit bilan birga)")
+
+    def handle(self, *args, **options):
+        algorithm = api_settings.ALGORITHM
+        if algorithm.startswith("HS"):
+            raise CommandError(f"{algorithm} simmetrik algoritm, JWT_ALGORITHM ni RS256 yoki EdDSA qiling")
+        if options['keep'] < 2:
+            raise CommandError("--keep kamida 2 bo'lishi kerak, aks holda chiqarilgan tokenlar yaroqsiz bo'ladi")
+
+        kid = datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')
+        path = write_private_key(settings.JWT_KEYS_DIR, kid, generate_private_key(algorithm))
+        self.stdout.write(self.style.SUCCESS(f"Yangi {algorithm} kaliti yaratildi: {path}"))
+
+        # Kalit o'zidan keyingi kalit yaratilguncha tokenlarni imzolaydi. Shu paytdan beri refresh (va access)
+        # token muddati o'tgan bo'lsagina u imzolagan tokenlarning hammasi eskirgan, kalitni o'chirish mumkin
+        # (jarayonlar yangi kalit yaratilgandan keyin darhol qayta ishga tushiriladi deb hisoblanadi)
+        lifetime = max(api_settings.REFRESH_TOKEN_LIFETIME, api_settings.ACCESS_TOKEN_LIFETIME).total_seconds()
+        keys = sorted(Path(settings.JWT_KEYS_DIR).glob('*.pem'))
+        for old, successor in zip(keys[:-options['keep']], keys[1:]):
+            retired = successor.stat().st_mtime
+            if time.time() - retired <= lifetime:
+                continue
+            old.unlink()
+            self.stdout.write(f"Eski kalit o'chirildi: {old}")
@@ -0,0 +1,107 @@
+import json
+import os
+import time
+
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand, CommandError
+
+from shared.email_templates import render_email
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = "Barcha faol foydalanuvchilarga bitta shablondan render qilingan xabarni paketlab jo'natadi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--template', required=True, help="Email shabloni nomi")
+        parser.add_argument('--subject', required=True, help="Email mavzusi")
+        parser.add_argument('--locale', default=None, help="Shablon render qilinadigan til")
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help="Bitta send_messages chaqiruvidagi emaillar soni")
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help="Bazadan bir martada o'qiladigan foydalanuvchilar soni")
+        parser.add_argument('--rate', type=float, default=0,
+                            help="Soniyasiga jo'natiladigan emaillar soni chegarasi (0 - cheklanmagan)")
+        parser.add_argument('--checkpoint', default=None,
+                            help="Jarayon holati saqlanadigan fayl. Fayl mavjud bo'lsa jo'natish shu joydan davom etadi")
+
+    def handle(self, *args, **options):
+        body = render_email(options['template'], {}, options['locale'])
+        state = self.load_checkpoint(options['checkpoint'])
+        if state['last_id']:
+            self.stdout.write(f"{state['last_id']} dan keyin davom etilmoqda ({state['sent']} ta jo'natilgan)")
+
+        users = User.objects.filter(is_active=True).exclude(email='').order_by('id')
+        if state['last_id']:
+            users = users.filter(id__gt=state['last_id'])
+        rows = users.values_list('id', 'email').iterator(chunk_size=options['chunk_size'])
+
+        connection = get_connection(fail_silently=False)
+        connection.open()
+        sent = 0
+        started = time.monotonic()
+        batch = []
+        try:
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= options['batch_size']:
+                    sent += self.send_batch(connection, batch, options['subject'], body)
+                    self.save_checkpoint(options['checkpoint'], batch[-1][0], state['sent'] + sent)
+                    self.throttle(sent, started, options['rate'])
+                    batch = []
+            if batch:
+                sent += self.send_batch(connection, batch, options['subject'], body)
+                self.save_checkpoint(options['checkpoint'], batch[-1][0], state['sent'] + sent)
+        finally:
+            connection.close()
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f"{sent} ta email {elapsed:.1f} soniyada jo'natildi "
+                f"({sent / elapsed if elapsed else 0:.1f} email/s)"
+            )
+
+    def send_batch(self, connection, batch, subject, body):
+        """
+        Paketni ochiq ulanish orqali jo'natadi. Xatolik bo'lsa ulanish qayta ochilib paket
+        yana bir marta jo'natiladi, ikkinchi xatolikda buyruq to'xtaydi (checkpoint dan davom etish mumkin).
+        """
+        messages = []
+        for _, email in batch:
+            message = EmailMessage(subject=subject, body=body, to=[email], connection=connection)
+            message.content_subtype = 'html'
+            messages.append(message)
+        try:
+            return connection.send_messages(messages) or 0
+        except Exception:
+            connection.close()
+            connection.open()
+            try:
+                return connection.send_messages(messages) or 0
+            except Exception as e:
+                raise CommandError(f"Paketni jo'natib bo'lmadi ({batch[0][0]} dan boshlab): {e}")
+
+    @staticmethod
+    def throttle(sent, started, rate):
+        # Jo'natish tezligini --rate dan oshirmaslik uchun kerakli vaqtgacha kutish
+        if rate <= 0:
+            return
+        delay = sent / rate - (time.monotonic() - started)
+        if delay > 0:
+            time.sleep(delay)
+
+    @staticmethod
+    def load_checkpoint(path):
+        if path and os.path.exists(path):
+            with open(path) as f:
+                return json.load(f)
+        return {"last_id": None, "sent": 0}
+
+    @staticmethod
+    def save_checkpoint(path, last_id, sent):
+        if not path:
+            return
+        # Yarim yozilgan fayl qolmasligi uchun avval vaqtinchalik faylga yozamiz
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"last_id": str(last_id), "sent": sent}, f)
+        os.replace(tmp_path, path)
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0004_user_users_user_email_lower_idx_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="userconfirmation",
+            index=models.Index(
+                condition=models.Q(("is_confirmed", False)),
+                fields=["user", "expiration_time"],
+                name="users_confirm_active_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="userconfirmation",
+            index=models.Index(
+                fields=["expiration_time"], name="users_confirm_expiry_idx"
+            ),
+        ),
+    ]
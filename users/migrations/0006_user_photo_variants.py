@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0005_userconfirmation_users_confirm_active_idx_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="photo_variants",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:53
+
+import django.core.validators
+import shared.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0006_user_photo_variants"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="user",
+            name="photo",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=shared.storage.get_photo_storage,
+                upload_to="user_photos/",
+                validators=[
+                    django.core.validators.FileExtensionValidator(
+                        allowed_extensions=["jpg", "jpeg", "png"]
+                    )
+                ],
+            ),
+        ),
+    ]
@@ -1,17 +1,35 @@
-import uuid
 import random
-from datetime import datetime, timedelta
+import secrets
+from datetime import timedelta
 
+from asgiref.sync import sync_to_async
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX, check_password
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import FileExtensionValidator
-from django.db import models
-from rest_framework_simplejwt.tokens import RefreshToken
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django.db.models.functions import Lower
+from django.utils import timezone
 
 from shared.models import BaseModel
+from shared.storage import get_photo_storage
+from .cache import invalidate_cached_user
+from .hashers import acheck_password, schedule_rehash
+from .tokens import issue_tokens, blacklist_user_tokens
 
 NEW, CODE_VERIFIED, DONE, PHOTO_DONE = ('new', 'code_verified', 'done', 'photo_done')
 ORDINARY_USER, MANAGER, ADMIN = ('ordinary_user', 'manager', 'admin')
 
+# Yaratilgan username band bo'lsa INSERT necha marta qayta urinilishi
+USERNAME_ATTEMPTS = 3
+# Token versiyasi parallel o'zgarganda holat o'tishi necha marta qayta urinilishi
+TRANSITION_ATTEMPTS = 3
+
+
+def generate_username():
+    # 2^64 ta variant: o'nlab million foydalanuvchida ham to'qnashuv ehtimoli juda kichik
+    return f"instagram-{secrets.token_hex(8)}"
+
 
 class User(AbstractUser, BaseModel):
     AUTH_STATUS = (
@@ -30,34 +48,55 @@ class User(AbstractUser, BaseModel):
     user_roles = models.CharField(max_length=31, choices=USER_ROLES, default=ORDINARY_USER)
     auth_status = models.CharField(max_length=31, choices=AUTH_STATUS, default=NEW)
     email = models.EmailField(null=False, blank=False, unique=True)
-    photo = models.ImageField(upload_to='user_photos/', null=True, blank=True,
+    # Fayllar kontent xeshi bo'yicha nomlanadi va papkalarga taqsimlanadi (shared.storage.ContentAddressedStorage)
+    photo = models.ImageField(upload_to='user_photos/', storage=get_photo_storage, null=True, blank=True,
                               validators=[FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png'])])
+    # Rasmning kichraytirilgan variantlari: {"150": {"webp": "<nom>", "jpeg": "<nom>"}, ...} (users.photos)
+    photo_variants = models.JSONField(default=dict, blank=True)
+    # auth_status yoki rol o'zgarganda oshiriladi, eski versiyali tokenlar rad etiladi
+    token_version = models.PositiveIntegerField(default=0)
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Login email/username ni katta-kichik harfga qaramasdan LOWER() orqali qidiradi
+            models.Index(Lower('email'), name='users_user_email_lower_idx'),
+            models.Index(Lower('username'), name='users_user_username_lower_idx'),
+        ]
 
     def __str__(self):
         return self.username
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(User, cls).from_db(db, field_names, values)
+        # Bazadan o'qilgan holat va rolni eslab qolish (token versiyasini oshirish uchun)
+        instance._loaded_claims = (instance.__dict__.get('auth_status'), instance.__dict__.get('user_roles'))
+        return instance
+
     @property
     def full_name(self):
         return f"{self.first_name} {self.last_name}"
 
     def create_verify_code(self):
         code = "".join([str(random.randint(1, 100) % 10) for _ in range(4)])
-        UserConfirmation.objects.create(
-            user_id=self.id,
-            code=code
-        )
+        # Kod VERIFICATION_CODE_STORE sozlamasidagi omborga (baza yoki kesh) yoziladi
+        from .verification import get_code_store
+        get_code_store().add(self, code)
+        return code
+
+    async def acreate_verify_code(self):
+        code = "".join([str(random.randint(1, 100) % 10) for _ in range(4)])
+        from .verification import get_code_store
+        await get_code_store().aadd(self, code)
         return code
 
     def check_username(self):
         # username maydoni bo'shligini tekshirish
         if not self.username:
-            # UUID yordamida vaqtinchalik username yaratish
-            temp_username = f"instagram-{uuid.uuid4().__str__().split('-')[-1]}"
-            # Yaratilgan username noyob ekanligini ta'minlash
-            while User.objects.filter(username=temp_username).exists():
-                temp_username = f"{temp_username}{random.randint(0, 9)}"
-            # Noyob vaqtinchalik username ni username maydoniga o'rnatish
-            self.username = temp_username
+            # Tasodifiy 64 bitli vaqtinchalik username yaratish, noyoblikni unique cheklovi ta'minlaydi
+            self.username = generate_username()
+            return True
+        return False
 
     def check_email(self):
         # Agar email manzili mavjud bo'lsa
@@ -70,39 +109,127 @@ class User(AbstractUser, BaseModel):
     def check_pass(self):
         # password maydoni bo'shligini tekshirish
         if not self.password:
-            # UUID yordamida vaqtinchalik parol yaratish
-            temp_password = f"password-{uuid.uuid4().__str__().split('-')[-1]}"
-            # Vaqtinchalik parolni password maydoniga o'rnatish
-            self.password = temp_password
+            # Parol hali o'rnatilmagan: xeshlash o'rniga ishlatib bo'lmaydigan parol belgisi qo'yiladi
+            self.set_unusable_password()
 
     def hashing_password(self):
+        # Ishlatib bo'lmaydigan parol belgisi ("!") xeshlanmaydi
+        if self.password.startswith(UNUSABLE_PASSWORD_PREFIX):
+            return
         # password maydoni pbkdf2_sha256 bilan boshlanmasligini tekshirish
         if not self.password.startswith('pbkdf2_sha256'):
             # Parolni xesh qilish uchun self.set_password metodidan foydalanish
             self.set_password(self.password)
 
-    def token(self):
-        # Foydalanuvchi uchun yangilanish tokenini yaratish
-        refresh = RefreshToken.for_user(self)
-        return {
-            # Yangilanish tokenidan foydalanib kirish tokenini olish
-            "access": str(refresh.access_token),
-            # Yangilanish tokenini olish
-            "refresh_token": str(refresh)
-        }
+    def check_token_version(self, update_fields=None):
+        # Bazadan o'qilgan holat yoki rol o'zgargan bo'lsa token versiyasini oshirish
+        loaded = getattr(self, '_loaded_claims', None)
+        current = (self.auth_status, self.user_roles)
+        if loaded is not None and loaded != current:
+            self.token_version += 1
+            self._loaded_claims = current
+            if update_fields is not None:
+                update_fields = set(update_fields) | {'token_version'}
+        return update_fields
+
+    def check_password(self, raw_password):
+        # Parol eskirgan parametrlar bilan xeshlangan bo'lsa, u javobni kutdirmasdan fonda qayta xeshlanadi
+        return check_password(raw_password, self.password, lambda raw: schedule_rehash(self, raw))
+
+    async def acheck_password(self, raw_password):
+        # Parol xeshi pool da hisoblanadi, event loop bloklanmaydi
+        return await acheck_password(raw_password, self.password, lambda raw: schedule_rehash(self, raw))
+
+    def token(self, endpoint=None):
+        # Foydalanuvchi uchun bitta access/refresh juftligini chiqarish (ikkalasi bir martadan imzolanadi)
+        return issue_tokens(self, endpoint)
+
+    def transition_auth_status(self, expected, new, **fields):
+        """
+        auth_status ni expected holatdan new holatga bitta shartli UPDATE bilan o'tkazadi
+        (UPDATE ... WHERE auth_status = expected AND token_version = <joriy>). Parallel so'rov holatni
+        allaqachon o'zgartirgan bo'lsa hech narsa yozilmaydi.
+        Args:
+            expected (str): Joriy holat.
+            new (str): Yangi holat.
+            **fields: Shu UPDATE da birga yoziladigan boshqa maydonlar.
+        Returns:
+            bool: O'tish bajarilgan bo'lsa True.
+        """
+        now = timezone.now()
+        for _ in range(TRANSITION_ATTEMPTS):
+            # Yangi token versiyasi oldindan ma'lum bo'lishi uchun u ham shartga qo'shiladi
+            updated = User.objects.filter(
+                pk=self.pk, auth_status=expected, token_version=self.token_version
+            ).update(auth_status=new, token_version=self.token_version + 1, updated_time=now, **fields)
+            if updated:
+                break
+            # Holat yoki token versiyasi boshqa so'rovda o'zgargan, bazadagi qiymatlar bilan qayta tekshiramiz
+            self.refresh_from_db(fields=['auth_status', 'token_version'])
+            if self.auth_status != expected:
+                return False
+        else:
+            return False
+        for name, value in fields.items():
+            setattr(self, name, value)
+        self.auth_status = new
+        self.token_version += 1
+        self.updated_time = now
+        self._loaded_claims = (self.auth_status, self.user_roles)
+        invalidate_cached_user(self.pk)
+        return True
+
+    async def atransition_auth_status(self, expected, new, **fields):
+        return await sync_to_async(self.transition_auth_status)(expected, new, **fields)
+
+    def revoke_sessions(self):
+        # Barcha refresh tokenlarni qora ro'yxatga qo'shish
+        count = blacklist_user_tokens(self.pk)
+        # Token versiyasini oshirib, chiqarilgan access tokenlarni ham bekor qilish
+        User.objects.filter(pk=self.pk).update(token_version=F('token_version') + 1)
+        self.refresh_from_db(fields=['token_version'])
+        invalidate_cached_user(self.pk)
+        return count
 
     def save(self, *args, **kwargs):
         # Email manzilini tekshirish
         self.check_email()
         # Username maydoni bo'sh bo'lsa, vaqtinchalik noyob username yaratish
-        self.check_username()
-        # Parol maydoni bo'sh bo'lsa, vaqtinchalik parol yaratish
+        generated = self.check_username()
+        # Parol maydoni bo'sh bo'lsa, ishlatib bo'lmaydigan parol belgisini qo'yish
         self.check_pass()
         # Parol allaqachon xeshlanmagan bo'lsa, parolni xeshlash
         self.hashing_password()
+        # Holat yoki rol o'zgargan bo'lsa token versiyasini oshirish
+        kwargs['update_fields'] = self.check_token_version(kwargs.get('update_fields'))
+        # Yaratilgan username band bo'lib chiqsa INSERT yangi username bilan qayta bajariladi
+        if generated and self._state.adding:
+            self.insert_with_generated_username(*args, **kwargs)
+            return
         # Super klassning save metodini chaqirish va o'zgarishlarni saqlash
         super(User, self).save(*args, **kwargs)
 
+    def insert_with_generated_username(self, *args, **kwargs):
+        # Xato bo'lganda tashqi tranzaksiya buzilmasligi uchun u ichida INSERT savepoint bilan bajariladi
+        in_transaction = transaction.get_connection(kwargs.get('using')).in_atomic_block
+        for attempt in range(USERNAME_ATTEMPTS):
+            try:
+                if in_transaction:
+                    with transaction.atomic(using=kwargs.get('using')):
+                        super(User, self).save(*args, **kwargs)
+                else:
+                    super(User, self).save(*args, **kwargs)
+                return
+            except IntegrityError:
+                # Xato matni backendga bog'liq, shuning uchun faqat username haqiqatan band bo'lsa qayta
+                # urinamiz (email kabi boshqa cheklovlar buzilgan bo'lsa xato o'zgarishsiz ko'tariladi)
+                if attempt == USERNAME_ATTEMPTS - 1 or not self.username_taken(kwargs.get('using')):
+                    raise
+                self.username = generate_username()
+
+    def username_taken(self, using=None):
+        return User.objects.using(using).filter(username=self.username).exists()
+
 
 EMAIL_EXPIRE = 5  # Tasdiqlash kodining amal qilish muddati (daqiqa hisobida)
 
@@ -113,10 +240,22 @@ class UserConfirmation(BaseModel):
     expiration_time = models.DateTimeField(null=True)  # Kodning tugash vaqti
     is_confirmed = models.BooleanField(default=False)  # Kod tasdiqlanganligini belgilovchi flag
 
+    class Meta:
+        indexes = [
+            # Foydalanuvchining faol (tasdiqlanmagan) kodlarini muddat bo'yicha qidirish uchun
+            models.Index(
+                fields=['user', 'expiration_time'],
+                condition=models.Q(is_confirmed=False),
+                name='users_confirm_active_idx',
+            ),
+            # Muddati o'tgan kodlarni tozalash (purge_confirmations) uchun
+            models.Index(fields=['expiration_time'], name='users_confirm_expiry_idx'),
+        ]
+
     def __str__(self):
         return str(self.user.__str__())
 
     def save(self, *args, **kwargs):
         # Tasdiqlash kodining amal qilish muddatini hozirgi vaqtdan EMAIL_EXPIRE daqiqa keyin o‘rnatish
-        self.expiration_time = datetime.now() + timedelta(minutes=EMAIL_EXPIRE)
+        self.expiration_time = timezone.now() + timedelta(minutes=EMAIL_EXPIRE)
         super(UserConfirmation, self).save(*args, **kwargs)
@@ -0,0 +1,61 @@
+import hmac
+
+from django.conf import settings
+from rest_framework.permissions import BasePermission
+
+from .models import DONE, PHOTO_DONE, MANAGER, ADMIN
+from .tokens import AUTH_STATUS_CLAIM, ROLE_CLAIM
+
+
+class HasAuthStatus(BasePermission):
+    """
+    Access tokendagi auth_status claim i bo'yicha ruxsat beradi, bazaga murojaat qilmaydi.
+    """
+    message = "Bu amal uchun ro'yxatdan o'tishni yakunlashingiz kerak"
+    allowed_statuses = ()
+
+    def has_permission(self, request, view):
+        token = request.auth
+        if token is None:
+            return False
+        return token.get(AUTH_STATUS_CLAIM) in self.allowed_statuses
+
+
+class IsRegistrationDone(HasAuthStatus):
+    allowed_statuses = (DONE, PHOTO_DONE)
+
+
+class HasUserRole(BasePermission):
+    """
+    Access tokendagi role claim i bo'yicha ruxsat beradi, bazaga murojaat qilmaydi.
+    """
+    message = "Sizda bu amal uchun ruxsat yo'q"
+    allowed_roles = ()
+
+    def has_permission(self, request, view):
+        token = request.auth
+        if token is None:
+            return False
+        return token.get(ROLE_CLAIM) in self.allowed_roles
+
+
+class IsManager(HasUserRole):
+    allowed_roles = (MANAGER, ADMIN)
+
+
+class IsAdmin(HasUserRole):
+    allowed_roles = (ADMIN,)
+
+
+class IsIntrospectionClient(BasePermission):
+    """
+    Token introspection endpointiga faqat INTROSPECTION_API_KEYS dagi kalitni
+    X-Introspection-Key sarlavhasida yuborgan servislar (masalan API gateway) kira oladi.
+    """
+    message = "Introspection kaliti noto'g'ri"
+
+    def has_permission(self, request, view):
+        key = request.headers.get('X-Introspection-Key', '')
+        return bool(key) and any(
+            hmac.compare_digest(key, allowed) for allowed in getattr(settings, 'INTROSPECTION_API_KEYS', ())
+        )
@@ -0,0 +1,118 @@
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+from .cache import invalidate_cached_user
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+_options = getattr(settings, 'PHOTO_VARIANTS', {})
+SIZES = tuple(_options.get('SIZES', (64, 150, 320)))
+FORMATS = tuple(_options.get('FORMATS', ('webp', 'jpeg')))
+DEFAULT_FORMAT = _options.get('DEFAULT_FORMAT', FORMATS[0])
+QUALITY = _options.get('QUALITY', 80)
+# Variantlar asl rasmlar yonidagi alohida papkada saqlanadi
+VARIANTS_DIR = 'user_photos/variants'
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def get_photo_executor():
+    """
+    Rasm variantlarini yaratuvchi jarayon uchun yagona thread pool (fork dan keyin qayta yaratiladi).
+    Pillow resize va kodlash vaqtida GIL ni bo'shatadi, shuning uchun threadlar yetarli.
+    """
+    global _executor, _executor_pid
+    pid = os.getpid()
+    if _executor is None or _executor_pid != pid:
+        with _executor_lock:
+            if _executor is None or _executor_pid != pid:
+                _executor = ThreadPoolExecutor(
+                    max_workers=_options.get('WORKERS', 2), thread_name_prefix='photo-variants'
+                )
+                _executor_pid = pid
+    return _executor
+
+
+def build_variants(field_file):
+    """
+    Asl rasmdan har bir o'lcham va format uchun kvadrat variant yaratib storage ga yozadi.
+    EXIF dagi burilish rasmga qo'llanadi, metama'lumotlarning o'zi esa variantlarga yozilmaydi.
+    Args:
+        field_file (FieldFile): Foydalanuvchining asl rasmi.
+    Returns:
+        dict: {"150": {"webp": "<nom>", "jpeg": "<nom>"}, ...} ko'rinishidagi variantlar.
+    """
+    storage = field_file.storage
+    stem = os.path.splitext(os.path.basename(field_file.name))[0]
+    with field_file.open('rb') as f:
+        with Image.open(f) as original:
+            image = ImageOps.exif_transpose(original).convert('RGB')
+    variants = {}
+    for size in SIZES:
+        resized = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+        variants[str(size)] = {}
+        for image_format in FORMATS:
+            buffer = io.BytesIO()
+            resized.save(buffer, image_format.upper(), quality=QUALITY, optimize=True)
+            name = storage.save(
+                f"{VARIANTS_DIR}/{stem}_{size}.{EXTENSIONS[image_format]}", ContentFile(buffer.getvalue())
+            )
+            variants[str(size)][image_format] = name
+    return variants
+
+
+def process_photo(user_id, photo_name):
+    try:
+        user = User.objects.only('id', 'photo').get(pk=user_id)
+        if user.photo.name != photo_name:
+            # Rasm shu orada yana almashtirilgan, yangisi uchun alohida vazifa bor
+            return
+        variants = build_variants(user.photo)
+        # Rasm hali ham o'sha bo'lsagina variantlar yoziladi
+        if User.objects.filter(pk=user_id, photo=photo_name).update(photo_variants=variants):
+            invalidate_cached_user(user_id)
+    except Exception:
+        logger.exception("Rasm variantlarini yaratib bo'lmadi: %s", photo_name)
+
+
+def _process_in_worker(user_id, photo_name):
+    # Pool threadlari so'rov siklidan tashqarida, shuning uchun eskirgan ulanishlar shu yerda yopiladi
+    close_old_connections()
+    try:
+        process_photo(user_id, photo_name)
+    finally:
+        close_old_connections()
+
+
+def schedule_variants(user):
+    """
+    Tranzaksiya muvaffaqiyatli tugagach foydalanuvchi rasmi variantlarini fonda yaratishni boshlaydi.
+    """
+    user_id, photo_name = user.pk, user.photo.name
+    transaction.on_commit(lambda: get_photo_executor().submit(_process_in_worker, user_id, photo_name))
+
+
+def pick_variant(user, size, image_format):
+    """
+    So'ralgan o'lchamdan kichik bo'lmagan eng kichik variantni tanlaydi. Variantlar hali tayyor
+    bo'lmasa (yoki so'ralgan o'lcham hammasidan katta bo'lsa) asl rasm qaytariladi.
+    Returns:
+        tuple: (storage dagi fayl nomi, variant o'lchami yoki None).
+    """
+    for candidate in sorted(SIZES):
+        variant = (user.photo_variants or {}).get(str(candidate), {})
+        if candidate >= size and image_format in variant:
+            return variant[image_format], candidate
+    return user.photo.name, None
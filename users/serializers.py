@@ -1,13 +1,17 @@
+from django.conf import settings
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import update_last_login
 from django.contrib.auth.password_validation import validate_password
 from django.core.validators import FileExtensionValidator
+from django.db import transaction
 from rest_framework.generics import get_object_or_404
+from rest_framework_simplejwt.exceptions import InvalidToken
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
-from rest_framework_simplejwt.tokens import AccessToken
 
 from shared.utility import check_email_or_other, send_email, check_input_type
 from .models import User, CODE_VERIFIED, DONE, PHOTO_DONE, NEW
+from .photos import schedule_variants
+from .tokens import add_user_claims, UserRefreshToken, UserAccessToken, VERSION_CLAIM
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError, PermissionDenied, NotFound
 
@@ -34,14 +38,14 @@ class SignUpSerializer(serializers.ModelSerializer):
         )
 
     def create(self, validated_data):
-        # `super` yordamida ota klassning `create` metodini chaqirib, foydalanuvchini yaratadi.
-        user = super(SignUpSerializer, self).create(validated_data)
-        # Yangi yaratilgan foydalanuvchi uchun verifikatsiya kodini yaratadi.
-        code = user.create_verify_code()
-        # Verifikatsiya kodini foydalanuvchining elektron pochta manziliga yuboradi.
-        send_email(user.email, code)
-        # Foydalanuvchini saqlaydi.
-        user.save()
+        # Foydalanuvchi, tasdiqlash kodi va email bitta tranzaksiyada yoziladi
+        with transaction.atomic():
+            # `super` yordamida ota klassning `create` metodini chaqirib, foydalanuvchini yaratadi.
+            user = super(SignUpSerializer, self).create(validated_data)
+            # Yangi yaratilgan foydalanuvchi uchun verifikatsiya kodini yaratadi.
+            code = user.create_verify_code()
+            # Verifikatsiya kodini foydalanuvchining elektron pochta manziliga yuboradi.
+            send_email(user.email, code)
         # Yaratilgan foydalanuvchini qaytaradi.
         return user
 
@@ -92,7 +96,7 @@ class SignUpSerializer(serializers.ModelSerializer):
         # Super klassning to_representation metodini chaqirib, instance ma'lumotlarini olish
         data = super(SignUpSerializer, self).to_representation(instance)
         # instance.token() metodidan foydalanib, foydalanuvchi uchun yangilanish tokenlarini olish
-        token_data = instance.token()
+        token_data = instance.token(endpoint='signup')
         # data o'zgaruvchisiga yangilanish tokenlarni qo'shib qo'yish
         data.update(token_data)
         # Tuzilgan ma'lumotlarni qaytarish
@@ -174,12 +178,14 @@ class ChangeUserInformation(serializers.Serializer):
         if validated_data.get('password'):
             instance.set_password(validated_data.get('password'))
 
-        # Foydalanuvchi tasdiqlangan holatiga o'zgartirilganligini belgilash
-        if instance.auth_status == CODE_VERIFIED:
-            instance.auth_status = DONE
+        fields = ['first_name', 'last_name', 'username', 'password']
+        # Foydalanuvchini tasdiqlangan holatga o'tkazish va ma'lumotlarni bitta shartli UPDATE da yozish
+        if instance.auth_status == CODE_VERIFIED and instance.transition_auth_status(
+                CODE_VERIFIED, DONE, **{name: getattr(instance, name) for name in fields}):
+            return instance
 
-        # Ma'lumotlarni saqlash
-        instance.save()
+        # Holat o'zgarmasa faqat shu ustunlarni saqlash
+        instance.save(update_fields=fields + ['updated_time'])
         return instance
 
 class ChangeUserPhotoSerializer(serializers.Serializer):
@@ -189,9 +195,14 @@ class ChangeUserPhotoSerializer(serializers.Serializer):
         photo = validate_data.get('photo')
 
         if photo:
-            instance.photo = photo
-            instance.auth_status = PHOTO_DONE
-            instance.save()
+            # Fayl storage ga yoziladi, bazaga esa faqat uning nomi yoziladi
+            instance.photo.save(photo.name, photo, save=False)
+            # Eski rasm variantlari yangi variantlar tayyor bo'lguncha berilmaydi
+            instance.photo_variants = {}
+            if not instance.transition_auth_status(DONE, PHOTO_DONE, photo=instance.photo.name, photo_variants={}):
+                instance.save(update_fields=['photo', 'photo_variants', 'updated_time'])
+            # Kichraytirilgan variantlar fonda yaratiladi
+            schedule_variants(instance)
         return instance
 
 class LoginSerializer(TokenObtainPairSerializer):
@@ -202,73 +213,64 @@ class LoginSerializer(TokenObtainPairSerializer):
         self.fields['username'] = serializers.CharField(required=False, read_only=True)
 
     def auth_validate(self, data):
-        global username
         user_input = data.get('user_input')
-        if check_input_type(user_input) == "username":
-            username = user_input
-        elif check_input_type(user_input) == "email":
-            user = self.get_user(email__iexact=user_input)
-            username = user_input
-        else:
-            data = {
-                "success": False,
-                "message": "Siz username yoki email  jo'natishingiz kerak"
-            }
-
-        authentication_kwargs = {
-            self.username_field: username,
-            'password': data['password']
-        }
-
-        # user statusini tekshiramiz
-        current_user = User.objects.filter(username__iexact=username).first()
-        if current_user is not None and current_user.auth_status in [NEW, CODE_VERIFIED]:
-            raise ValidationError({
-                "success": False,
-                "message": "Siz ro'yxatdan to'liq o'tmagansiz"
-            })
-        user = authenticate(**authentication_kwargs)
-        if user is not None:
-            self.user = user
-        else:
+        # Kiritilgan ma'lumot email yoki username formatida ekanligini tekshirish
+        check_input_type(user_input)
+        # Foydalanuvchi bitta so'rov bilan topiladi va paroli tekshiriladi
+        user = authenticate(self.context.get('request'), user_input=user_input, password=data['password'])
+        if user is None:
             raise ValidationError(
                 {
                     "success": False,
                     "message": "Kechirasiz, login yoki parolingiz xato,Ilimos qaytadan urinib ko'ring"
                 }
             )
-
+        # user statusini tekshiramiz
+        if user.auth_status in [NEW, CODE_VERIFIED]:
+            raise ValidationError({
+                "success": False,
+                "message": "Siz ro'yxatdan to'liq o'tmagansiz"
+            })
+        self.user = user
 
     def validate(self, data):
         self.auth_validate(data)
         if self.user.auth_status not in [DONE, PHOTO_DONE]:
             raise PermissionDenied("Siz login qila olmaysiz, Sizni ruxsatingiz yo'q")
-        data = self.user.token()
+        data = self.user.token(endpoint='login')
         data['auth_status'] = self.user.auth_status
         data['fullname'] = self.user.full_name
         return data
 
-    def get_user(self, **kwargs):
-        users = User.objects.filter(**kwargs)
-        if not users.exists():
-            raise ValidationError({
-                "message": "Bunda akkout topilmadi"
-            })
-        return users.first()
-
 class LoginRefreshSerializer(TokenRefreshSerializer):
+    # Qora ro'yxat tekshiruvi jarayon ichidagi indeks orqali bajariladi
+    token_class = UserRefreshToken
 
     def validate(self, attrs):
         data = super().validate(attrs)
-        access_token_instance = AccessToken(data['access'])
+        access_token_instance = UserAccessToken(data['access'])
         user_id = access_token_instance['user_id']
         user = get_object_or_404(User, id=user_id)
+        # Versiya oshgandan (barcha sessiyalar yopilgan, parol tiklangan yoki holat o'zgargan) oldin chiqarilgan
+        # refresh token, hatto qora ro'yxatga tushmagan bo'lsa ham, yangi access token bera olmaydi.
+        # ver claim i bo'lmagan tokenlar versiyalar joriy qilinishidan oldin chiqarilgan (0)
+        if access_token_instance.get(VERSION_CLAIM, 0) < user.token_version:
+            raise InvalidToken("Token eskirgan, qaytadan tizimga kiring")
         update_last_login(None, user)
+        # Yangi access tokenga foydalanuvchining joriy holati, roli va token versiyasini yozish
+        data['access'] = str(add_user_claims(access_token_instance, user))
         return data
 
 class LogoutSerializer(serializers.Serializer):
     refresh = serializers.CharField()
 
+class IntrospectSerializer(serializers.Serializer):
+    tokens = serializers.ListField(
+        child=serializers.CharField(),
+        allow_empty=False,
+        max_length=settings.INTROSPECTION_MAX_TOKENS
+    )
+
 class ForgotPasswordSerializer(serializers.Serializer):
     email = serializers.CharField(write_only=True, required=True)
 
@@ -1,3 +1,425 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import struct
+import threading
+import tempfile
+import time
+import zlib
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.files.base import ContentFile
+from django.core.mail import EmailMessage
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test import TestCase, override_settings
+from django.test.client import MULTIPART_CONTENT, encode_multipart, BOUNDARY
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+
+from shared.email_templates import render_email, template_cache
+from shared.mailer import EmailWorkerPool
+from shared.storage import get_photo_storage
+
+from .backends import afind_user, find_user
+from .hashers import PooledPBKDF2PasswordHasher, hash_pool
+from .models import User, NEW, CODE_VERIFIED, DONE
+from .photos import FORMATS, SIZES, pick_variant, process_photo
+from .tokens import introspect_tokens, outstanding_ledger
+from .views import CreateUserView, LoginView
+
+
+class SignUpTests(TestCase):
+
+    def setUp(self):
+        # Token yozuvlari fon threadida emas, test tranzaksiyasi ichida yozilsin
+        patcher = mock.patch.object(outstanding_ledger, 'asynchronous', False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(CreateUserView, 'throttle_classes', [])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def signup(self, email):
+        response = self.client.post('/users/signup/', {'email': email})
+        self.assertEqual(response.status_code, 201)
+        return response
+
+    def test_signup_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.signup('queries@example.com')
+        statements = [
+            query['sql'].split()[0].upper() for query in queries
+            if not query['sql'].upper().startswith(('SAVEPOINT', 'RELEASE SAVEPOINT'))
+        ]
+        # email tekshiruvi, foydalanuvchi, tasdiqlash kodi va OutstandingToken
+        self.assertEqual(statements, ['SELECT', 'INSERT', 'INSERT', 'INSERT'])
+        user = User.objects.get(email='queries@example.com')
+        self.assertEqual(user.auth_status, NEW)
+        self.assertFalse(user.has_usable_password())
+        self.assertEqual(user.verify_codes.count(), 1)
+
+    def test_generated_username_collision_is_retried(self):
+        taken = LoginTests.create_user('instagram-taken', 'taken@example.com')
+        with mock.patch('users.models.generate_username', side_effect=['instagram-taken', 'instagram-free']):
+            user = User.objects.create(email='collision@example.com')
+        self.assertEqual(user.username, 'instagram-free')
+        self.assertNotEqual(user.pk, taken.pk)
+
+    def test_other_integrity_errors_are_not_retried(self):
+        # PostgreSQL xato matnida qiymat ham bo'ladi: "Key (email)=(username@example.com) already exists"
+        LoginTests.create_user('instagram-first', 'username@example.com')
+        with mock.patch('users.models.generate_username', return_value='instagram-second') as generate:
+            with self.assertRaises(IntegrityError):
+                User.objects.create(email='username@example.com')
+        generate.assert_called_once()
+
+    def test_signup_does_not_hash_password(self):
+        # Parol berilmaydi: ishlatib bo'lmaydigan belgi qo'yiladi, hech qanday hasher chaqirilmasligi kerak
+        with mock.patch.object(PooledPBKDF2PasswordHasher, 'encode') as pooled_encode, \
+                mock.patch.object(PBKDF2PasswordHasher, 'encode') as encode, \
+                mock.patch.object(hash_pool, 'pbkdf2') as pbkdf2:
+            self.signup('nohash@example.com')
+        pooled_encode.assert_not_called()
+        encode.assert_not_called()
+        pbkdf2.assert_not_called()
+        self.assertFalse(User.objects.get(email='nohash@example.com').has_usable_password())
+
+class LoginTests(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(outstanding_ledger, 'asynchronous', False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(LoginView, 'throttle_classes', [])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # username lar faqat harflarning katta-kichikligi bilan farq qiladi
+        self.upper = self.create_user('CaseUser1', 'upper@example.com')
+        self.lower = self.create_user('caseuser1', 'lower@example.com')
+
+    @staticmethod
+    def create_user(username, email):
+        user = User(username=username, email=email, auth_status=DONE)
+        user.set_password('Secret-pass-1')
+        user.save()
+        return user
+
+    def login(self, user_input):
+        return self.client.post('/users/login/', {'user_input': user_input, 'password': 'Secret-pass-1'})
+
+    def test_case_only_usernames_resolve_to_exact_match(self):
+        self.assertEqual(find_user('caseuser1'), self.lower)
+        self.assertEqual(find_user('CaseUser1'), self.upper)
+        # Aynan mos keladigani yo'q: eng birinchi yaratilgani
+        self.assertEqual(find_user('CASEUSER1'), self.upper)
+
+    async def test_async_lookup_resolves_to_exact_match(self):
+        self.assertEqual(await afind_user('caseuser1'), self.lower)
+        self.assertEqual(await afind_user('CaseUser1'), self.upper)
+
+    def test_login_with_case_only_usernames(self):
+        for user_input in ('caseuser1', 'CaseUser1', 'CASEUSER1'):
+            self.assertEqual(self.login(user_input).status_code, 200)
+
+
+class RefreshTests(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(outstanding_ledger, 'asynchronous', False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = LoginTests.create_user('refresh-user', 'refresh@example.com')
+
+    def refresh(self, refresh_token):
+        return self.client.post('/users/login/refresh/', {'refresh': refresh_token})
+
+    def test_unrecorded_refresh_token_rejected_after_revoke(self):
+        # Jarayon buferi yozilmay qolgan token: OutstandingToken yozuvi yo'q, qora ro'yxatga ham tushmaydi
+        with mock.patch.object(outstanding_ledger, 'add'):
+            tokens = self.user.token()
+        self.assertEqual(self.refresh(tokens['refresh_token']).status_code, 200)
+        self.user.revoke_sessions()
+        self.assertEqual(self.refresh(tokens['refresh_token']).status_code, 401)
+        self.assertEqual(self.refresh(self.user.token()['refresh_token']).status_code, 200)
+
+    def test_status_change_returns_new_tokens(self):
+        User.objects.filter(pk=self.user.pk).update(auth_status=CODE_VERIFIED)
+        self.user.refresh_from_db()
+        old = self.user.token()
+        response = self.client.patch('/users/change-user/', {
+            'first_name': 'Refresh', 'last_name': 'Tester', 'username': 'refresh-user-2',
+            'password': 'Secret-pass-2', 'confirm_password': 'Secret-pass-2',
+        }, content_type='application/json', headers={'Authorization': f"Bearer {old['access']}"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['auth_status'], DONE)
+        self.assertEqual(self.refresh(old['refresh_token']).status_code, 401)
+        self.assertEqual(self.refresh(response.json()['refresh']).status_code, 200)
+
+
+class ThrottleTests(TestCase):
+
+    def test_non_object_body_is_throttled_by_ip(self):
+        # Throttle akkauntni JSON obyektdan o'qiydi: ro'yxat yuborilsa serializer xatosi qaytishi kerak
+        for url in ('/users/login/', '/users/signup/', '/users/forgot-password/'):
+            response = self.client.post(url, '[1, 2]', content_type='application/json')
+            self.assertEqual(response.status_code, 400, url)
+
+
+class IntrospectTests(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(outstanding_ledger, 'asynchronous', False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = LoginTests.create_user('introspect-user', 'introspect@example.com')
+
+    def test_rejected_tokens_are_not_active(self):
+        tokens = self.user.token()
+        self.assertTrue(all(result['active'] for result in introspect_tokens(list(tokens.values()))))
+        self.user.revoke_sessions()
+        fresh = self.user.token()
+        results = introspect_tokens([tokens['access'], tokens['refresh_token'], fresh['access']])
+        self.assertEqual([result['active'] for result in results], [False, False, True])
+        self.assertEqual(results[0]['error'], 'stale')
+
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        with CaptureQueriesContext(connection) as queries:
+            results = introspect_tokens([fresh['access']])
+        self.assertEqual(results[0]['error'], 'user_inactive')
+        # Foydalanuvchilar bitta so'rov bilan olinadi
+        self.assertEqual(len(queries), 1)
+
+
+class PhotoStorageTestMixin:
+
+    def use_temporary_media_root(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.storage = get_photo_storage()
+
+    def age(self, name, seconds=7200):
+        modified = time.time() - seconds
+        os.utime(self.storage.path(name), (modified, modified))
+        return name
+
+
+class PhotoGCTests(PhotoStorageTestMixin, TestCase):
+
+    def setUp(self):
+        self.use_temporary_media_root()
+
+    def save(self, name, content):
+        return self.age(self.storage.save(name, ContentFile(content)))
+
+    def write_legacy(self, name):
+        # Eski tekis nomlar storage ni chetlab yoziladi (ular xesh bo'yicha taqsimlanmagan)
+        with open(self.storage.path(name), 'wb') as f:
+            f.write(name.encode())
+        return self.age(name)
+
+    def test_only_old_unreferenced_files_are_removed(self):
+        photo = self.save('user_photos/photo.jpg', b'photo')
+        variant = self.save('user_photos/variants/photo_150.webp', b'variant')
+        orphan = self.save('user_photos/orphan.jpg', b'orphan')
+        young = self.age(self.storage.save('user_photos/young.jpg', ContentFile(b'young')), 0)
+        # Shard papka nomi bilan boshlanadigan eski nomlar: "." va "-" belgilari "/" dan oldin, raqamlar esa
+        # keyin tartiblanadi
+        shard = photo.split('/')[1]
+        legacy = [self.write_legacy(f'user_photos/{shard}{suffix}.jpg') for suffix in ('', '-old', '0')]
+        User.objects.create(username='gc-user', email='gc@example.com', photo=photo,
+                            photo_variants={'150': {'webp': variant}})
+        for number, name in enumerate(legacy):
+            User.objects.create(username=f'gc-legacy-{number}', email=f'gc-legacy-{number}@example.com', photo=name)
+        files = [photo, variant, orphan, young, *legacy]
+
+        output = io.StringIO()
+        call_command('gc_photos', dry_run=True, stdout=output)
+        self.assertTrue(all(self.storage.exists(name) for name in files))
+        self.assertEqual(output.getvalue().splitlines()[0], orphan)
+
+        # Kichik --run-size bilan papka ro'yxati vaqtinchalik fayllar orqali tartiblanadi
+        call_command('gc_photos', sleep=0, run_size=2, stdout=io.StringIO())
+        self.assertEqual([name for name in files if not self.storage.exists(name)], [orphan])
+        # Bo'shab qolgan shard papka ham o'chiriladi
+        self.assertFalse(os.path.exists(os.path.dirname(self.storage.path(orphan))))
+
+
+class UploadLimitTests(PhotoStorageTestMixin, TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(outstanding_ledger, 'asynchronous', False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.use_temporary_media_root()
+        self.user = User.objects.create(username='upload-user', email='upload@example.com', auth_status=DONE)
+        self.access = self.user.token()['access']
+
+    def upload(self, content, name='photo.png', **extra):
+        return self.client.put(
+            '/users/change-user-photo/', encode_multipart(BOUNDARY, {'photo': ContentFile(content, name)}),
+            content_type=MULTIPART_CONTENT, headers={'Authorization': f"Bearer {self.access}"}, **extra
+        )
+
+    @staticmethod
+    def png(width, height, noise=False):
+        if noise:
+            buffer = io.BytesIO()
+            Image.frombytes('RGB', (width, height), os.urandom(width * height * 3)).save(buffer, 'PNG')
+            return buffer.getvalue()
+        # Sarlavha va piksellarning kichik bir bo'lagi: rasmni oxirigacha dekodlab bo'lmaydi
+        def chunk(kind, data):
+            return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+        header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+        return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', zlib.compress(bytes(100)))
+
+    def assertNotSaved(self, response, status_code):
+        self.assertEqual(response.status_code, status_code)
+        self.assertIn('message', response.json())
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.photo)
+
+    def test_valid_photo_is_saved(self):
+        response = self.upload(self.png(32, 32, noise=True))
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.storage.exists(self.user.photo.name))
+
+    def test_oversized_content_length_is_rejected(self):
+        # Tana o'qilmasdan Content-Length bo'yicha rad etiladi
+        self.assertNotSaved(self.upload(self.png(32, 32, noise=True), CONTENT_LENGTH=str(2**40)), 413)
+
+    @mock.patch('shared.uploads.MAX_BYTES', 1024)
+    def test_file_larger_than_max_bytes_is_rejected(self):
+        self.assertNotSaved(self.upload(self.png(64, 64, noise=True)), 413)
+
+    def test_too_many_pixels_rejected_from_header(self):
+        with mock.patch.object(Image.Image, 'load') as load:
+            self.assertNotSaved(self.upload(self.png(5000, 5000)), 413)
+        load.assert_not_called()
+
+    def test_non_image_photo_is_rejected(self):
+        self.assertNotSaved(self.upload(b'not an image at all', 'photo.jpg'), 400)
+
+
+class PhotoVariantTests(PhotoStorageTestMixin, TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(outstanding_ledger, 'asynchronous', False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.use_temporary_media_root()
+        buffer = io.BytesIO()
+        Image.new('RGB', (400, 300), 'red').save(buffer, 'PNG')
+        self.user = User.objects.create(username='photo-user', email='photo@example.com', auth_status=DONE)
+        self.user.photo.save('photo.png', ContentFile(buffer.getvalue()))
+
+    def get_photo(self, query='', **headers):
+        access = self.user.token()['access']
+        return self.client.get(f'/users/photo/{query}', headers={'Authorization': f"Bearer {access}", **headers})
+
+    def test_variants_are_built_and_picked(self):
+        process_photo(self.user.pk, self.user.photo.name)
+        self.user.refresh_from_db()
+        self.assertEqual(set(self.user.photo_variants), {str(size) for size in SIZES})
+        for size, variant in self.user.photo_variants.items():
+            self.assertEqual(set(variant), set(FORMATS))
+            for image_format, name in variant.items():
+                with self.storage.open(name) as f, Image.open(f) as image:
+                    self.assertEqual(image.size, (int(size), int(size)))
+                    self.assertEqual(image.format, image_format.upper())
+        self.assertEqual(pick_variant(self.user, 100, 'jpeg'), (self.user.photo_variants['150']['jpeg'], 150))
+        # So'ralgan o'lcham hammasidan katta: asl rasm
+        self.assertEqual(pick_variant(self.user, 1000, 'webp'), (self.user.photo.name, None))
+
+    def test_replaced_photo_variants_are_not_written(self):
+        process_photo(self.user.pk, 'user_photos/old.png')
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.photo_variants, {})
+
+    def test_format_is_chosen_by_query_only(self):
+        process_photo(self.user.pk, self.user.photo.name)
+        self.user.refresh_from_db()
+        response = self.get_photo('?size=100', Accept='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['photo'], self.storage.url(self.user.photo_variants['150']['webp']))
+        response = self.get_photo('?size=100&image_format=jpeg')
+        self.assertEqual(response.json()['photo'], self.storage.url(self.user.photo_variants['150']['jpeg']))
+        self.assertEqual(self.get_photo('?image_format=gif').status_code, 400)
+
+
+@override_settings(TEMPLATES=[{
+    'BACKEND': 'django.template.backends.django.DjangoTemplates',
+    'OPTIONS': {'loaders': [('django.template.loaders.locmem.Loader', {
+        'bare.html': '<b>{{ code }}</b> {{ name }}',
+        'if.html': '{% if code %}kod: {{ code }}{% else %}kod yoq{% endif %}',
+        'default.html': '{{ code|default:"yoq" }}',
+        'safe.html': '{{ code|safe }}',
+        'base.html': '<p>{% block body %}{% endblock %}</p>',
+        'child.html': '{% extends "base.html" %}{% block body %}{{ code }}{% endblock %}',
+        'child_if.html': '{% extends "base.html" %}{% block body %}{% if code %}{{ code }}{% endif %}{% endblock %}',
+    })]},
+}])
+class EmailTemplateTests(TestCase):
+
+    def setUp(self):
+        template_cache.clear()
+        self.addCleanup(template_cache.clear)
+
+    def compiled(self, template_name, context):
+        return template_cache.get(template_name, tuple(sorted(context))).parts is not None
+
+    def test_bare_variables_are_compiled(self):
+        self.assertEqual(render_email('bare.html', {'code': '<1>', 'name': 'a'}), '<b>&lt;1&gt;</b> a')
+        self.assertTrue(self.compiled('bare.html', {'code': '', 'name': ''}))
+        self.assertEqual(render_email('child.html', {'code': '12'}), '<p>12</p>')
+        self.assertTrue(self.compiled('child.html', {'code': ''}))
+
+    def test_variables_outside_bare_nodes_are_rendered(self):
+        self.assertEqual(render_email('if.html', {'code': ''}), 'kod yoq')
+        self.assertEqual(render_email('if.html', {'code': '12'}), 'kod: 12')
+        self.assertEqual(render_email('default.html', {'code': ''}), 'yoq')
+        self.assertEqual(render_email('safe.html', {'code': '<b>1</b>'}), '<b>1</b>')
+        self.assertEqual(render_email('child_if.html', {'code': ''}), '<p></p>')
+        for template_name in ('if.html', 'default.html', 'safe.html', 'child_if.html'):
+            self.assertFalse(self.compiled(template_name, {'code': ''}), template_name)
+
+
+class EmailWorkerPoolTests(TestCase):
+
+    def setUp(self):
+        # Worker birinchi paketni jo'natayotganda to'xtab turadi, navbat shu vaqtda to'ladi
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+        connection = mock.Mock()
+        connection.send_messages.side_effect = lambda messages: self.release.wait(5)
+        patcher = mock.patch('shared.mailer.get_connection', return_value=connection)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pool = EmailWorkerPool(workers=1, queue_size=1, batch_size=1, put_timeout=0.01)
+
+    def fill_queue(self):
+        self.pool.queue.put((EmailMessage(to=['a@example.com']), time.monotonic()))
+        # Worker birinchi emailni olib bloklanguncha kutamiz, keyin navbatni to'ldiramiz
+        deadline = time.monotonic() + 5
+        while not self.pool.queue.empty() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.pool.queue.put((EmailMessage(to=['b@example.com']), time.monotonic()))
+
+    def test_inline_send_failure_is_not_raised(self):
+        self.fill_queue()
+        email = mock.Mock()
+        email.send.side_effect = ConnectionError("SMTP ishlamayapti")
+        self.pool.submit(email)
+        email.send.assert_called_once()
+        self.assertEqual(self.pool.stats()['failed'], 1)
+
+    def test_shutdown_gives_up_when_queue_stays_full(self):
+        self.fill_queue()
+        started = time.monotonic()
+        self.pool.shutdown(timeout=0.2)
+        self.assertLess(time.monotonic() - started, 2)
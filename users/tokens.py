@@ -0,0 +1,398 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections, connection
+from django.db.models.constants import OnConflict
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError, TokenBackendError, TokenBackendExpiredToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken, BlacklistedToken
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken, BlacklistMixin
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from .jwks import get_token_backend
+
+logger = logging.getLogger(__name__)
+
+# Access tokenga qo'shiladigan imzolangan claim lar
+AUTH_STATUS_CLAIM = 'auth_status'
+ROLE_CLAIM = 'role'
+VERSION_CLAIM = 'ver'
+
+
+def add_user_claims(token, user):
+    """
+    Tokenga foydalanuvchining avtorizatsiya holati, roli va token versiyasini yozadi.
+    Versiya auth_status yoki rol o'zgarganda oshadi, shuning uchun eski tokenlar rad etiladi.
+    """
+    token[AUTH_STATUS_CLAIM] = user.auth_status
+    token[ROLE_CLAIM] = user.user_roles
+    token[VERSION_CLAIM] = user.token_version
+    return token
+
+
+class UserAccessToken(AccessToken):
+    """
+    JWT_ALGORITHM ga mos backend (asimmetrik algoritmlarda kalitlar aylanishi bilan) orqali
+    imzolanadigan va tekshiriladigan access token.
+    """
+    def get_token_backend(self):
+        return get_token_backend()
+
+
+class UserRefreshToken(RefreshToken):
+    """
+    Foydalanuvchi claim lari yozilgan refresh token. Undan olingan access token ham shu
+    claim larni meros qilib oladi. OutstandingToken yozuvi bu yerda yaratilmaydi,
+    uni issue_tokens() OutstandingTokenLedger orqali yozadi.
+    """
+    access_token_class = UserAccessToken
+
+    def get_token_backend(self):
+        return get_token_backend()
+
+    @classmethod
+    def for_user(cls, user):
+        # BlacklistMixin.for_user ni chetlab o'tamiz: u tokenni alohida imzolab darhol INSERT qiladi
+        token = super(BlacklistMixin, cls).for_user(user)
+        return add_user_claims(token, user)
+
+    def check_blacklist(self):
+        # Qora ro'yxat indeksi yoqilgan bo'lsa tekshiruv bazaga murojaat qilmasdan bajariladi
+        if not blacklist_index.enabled:
+            return super(UserRefreshToken, self).check_blacklist()
+        if blacklist_index.contains(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        result = super(UserRefreshToken, self).blacklist()
+        blacklist_index.add(self.payload[api_settings.JTI_CLAIM], self.payload['exp'])
+        return result
+
+
+class OutstandingTokenLedger:
+    """
+    OutstandingToken yozuvlarini xotirada yig'ib, fon threadida bulk_create bilan yozuvchi bufer.
+    Jarayon kutilmaganda to'xtasa buferdagi yozuvlar yo'qoladi, lekin bu tokenni qora ro'yxatga
+    qo'shishga xalaqit bermaydi: blacklist() yozuvni get_or_create bilan yaratadi.
+    """
+    def __init__(self, batch_size=200, interval=1.0, asynchronous=True):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.asynchronous = asynchronous
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def add(self, user, token, token_str):
+        """
+        Token yozuvini buferga qo'shadi.
+        Args:
+            user (User): Token egasi.
+            token (RefreshToken): Chiqarilgan token.
+            token_str (str): Tokenning imzolangan ko'rinishi (qayta imzolamaslik uchun).
+        """
+        row = OutstandingToken(
+            user_id=user.pk,
+            jti=token[api_settings.JTI_CLAIM],
+            token=token_str,
+            created_at=token.current_time,
+            expires_at=datetime_from_epoch(token['exp']),
+        )
+        if not self.asynchronous:
+            OutstandingToken.objects.bulk_create([row], ignore_conflicts=True)
+            return
+        with self._lock:
+            self._buffer.append(row)
+            size = len(self._buffer)
+        self._ensure_thread()
+        if size >= self.batch_size:
+            self._wakeup.set()
+
+    def flush(self):
+        """
+        Buferdagi barcha yozuvlarni bazaga yozadi.
+        Returns:
+            int: Yozilgan yozuvlar soni.
+        """
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+        if rows:
+            OutstandingToken.objects.bulk_create(rows, batch_size=self.batch_size, ignore_conflicts=True)
+        return len(rows)
+
+    def _ensure_thread(self):
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid:
+            return
+        with self._lock:
+            if self._thread is None or self._pid != pid:
+                self._pid = pid
+                self._thread = threading.Thread(target=self._run, name="token-ledger", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("OutstandingToken yozuvlarini saqlab bo'lmadi")
+
+
+class TokenCounter:
+    """
+    Har bir endpoint uchun chiqarilgan token juftliklari soni.
+    """
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def increment(self, endpoint):
+        with self._lock:
+            self._counts[endpoint or 'other'] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counts)
+
+
+class BlacklistIndex:
+    """
+    Muddati hali tugamagan qora ro'yxatdagi tokenlarning jti -> exp (epoch) jadvali.
+    Har REFRESH_INTERVAL soniyada bazadan faqat oxirgi qo'shilgan yozuvlar o'qiladi, shuning uchun
+    boshqa jarayonda qora ro'yxatga qo'shilgan token ko'pi bilan shu muddat ichida ko'rinadi.
+    Server soatlari orasidagi farq sabab yozuv o'tkazib yuborilmasligi uchun oxirgi OVERLAP soniyadagi
+    yozuvlar har safar qayta o'qiladi.
+    """
+    def __init__(self, enabled=True, refresh_interval=1.0, overlap=30):
+        self.enabled = enabled
+        self.refresh_interval = refresh_interval
+        self.overlap = timedelta(seconds=overlap)
+        self._jtis = {}
+        self._watermark = None
+        self._refreshed_at = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def contains(self, jti):
+        self.refresh()
+        return jti in self._jtis
+
+    def add(self, jti, exp):
+        with self._lock:
+            self._jtis[jti] = exp
+
+    def _is_fresh(self):
+        return (self._pid == os.getpid() and self._refreshed_at is not None
+                and time.monotonic() - self._refreshed_at < self.refresh_interval)
+
+    def refresh(self, force=False):
+        """
+        Indeksni bazadagi yangi yozuvlar bilan to'ldiradi va muddati tugaganlarini o'chiradi.
+        Fork dan keyin indeks yangi jarayonda boshidan yuklanadi.
+        """
+        if not force and self._is_fresh():
+            return
+        with self._lock:
+            if not force and self._is_fresh():
+                return
+            if self._pid != os.getpid():
+                self._jtis, self._watermark, self._pid = {}, None, os.getpid()
+            now = timezone.now()
+            rows = BlacklistedToken.objects.filter(token__expires_at__gt=now)
+            if self._watermark is not None:
+                rows = rows.filter(blacklisted_at__gte=self._watermark - self.overlap)
+            watermark = self._watermark
+            for jti, expires_at, blacklisted_at in rows.values_list(
+                    'token__jti', 'token__expires_at', 'blacklisted_at').iterator():
+                self._jtis[jti] = expires_at.timestamp()
+                if watermark is None or blacklisted_at > watermark:
+                    watermark = blacklisted_at
+            self._watermark = watermark or now
+            current = now.timestamp()
+            self._jtis = {jti: exp for jti, exp in self._jtis.items() if exp > current}
+            self._refreshed_at = time.monotonic()
+
+
+_options = getattr(settings, 'BLACKLIST_INDEX', {})
+blacklist_index = BlacklistIndex(
+    enabled=_options.get('ENABLED', True),
+    refresh_interval=_options.get('REFRESH_INTERVAL', 1.0),
+    overlap=_options.get('OVERLAP', 30),
+)
+
+_options = getattr(settings, 'TOKEN_LEDGER', {})
+outstanding_ledger = OutstandingTokenLedger(
+    batch_size=_options.get('BATCH_SIZE', 200),
+    interval=_options.get('INTERVAL', 1.0),
+    asynchronous=_options.get('ASYNC', True),
+)
+token_counter = TokenCounter()
+
+
+def issue_tokens(user, endpoint=None):
+    """
+    Foydalanuvchi uchun bitta access/refresh juftligini chiqaradi. Har bir token faqat bir marta
+    imzolanadi, OutstandingToken yozuvi esa fonda paketlab yoziladi.
+    Args:
+        user (User): Token egasi.
+        endpoint (str): Token chiqarilgan endpoint nomi (hisoblagich uchun).
+    Returns:
+        dict: "access" va "refresh_token" kalitli lug'at.
+    """
+    refresh = UserRefreshToken.for_user(user)
+    refresh_token = str(refresh)
+    outstanding_ledger.add(user, refresh, refresh_token)
+    token_counter.increment(endpoint)
+    return {
+        "access": str(refresh.access_token),
+        "refresh_token": refresh_token
+    }
+
+
+async def aissue_tokens(user, endpoint=None):
+    """
+    issue_tokens ning async varianti. Tokenlar shu threadda imzolanadi, OutstandingToken yozuvi
+    faqat bufer o'chirilgan bo'lsa (TOKEN_LEDGER['ASYNC'] = False) alohida threadda yoziladi.
+    """
+    if outstanding_ledger.asynchronous:
+        return issue_tokens(user, endpoint)
+    return await sync_to_async(issue_tokens)(user, endpoint)
+
+
+def blacklist_user_tokens(user_id):
+    """
+    Foydalanuvchining muddati tugamagan barcha refresh tokenlarini bitta INSERT ... SELECT
+    so'rovi bilan qora ro'yxatga qo'shadi. Allaqachon qo'shilganlari o'tkazib yuboriladi.
+    Boshqa jarayonlarning buferida turgan (oxirgi TOKEN_LEDGER['INTERVAL'] soniyada chiqarilgan) yoki
+    jarayon to'xtab yozilmay qolgan tokenlar bu so'rovga tushmaydi. Ular User.revoke_sessions oshiradigan
+    token versiyasi orqali bekor bo'ladi: eski versiyali access tokenlarni CachedJWTAuthentication,
+    refresh tokenlarni esa LoginRefreshSerializer rad etadi.
+    Args:
+        user_id: Foydalanuvchi identifikatori.
+    Returns:
+        int: Qora ro'yxatga qo'shilgan tokenlar soni.
+    """
+    # Joriy jarayonda chiqarilgan tokenlar ham jadvalga tushishi kerak
+    outstanding_ledger.flush()
+    quote = connection.ops.quote_name
+    outstanding = OutstandingToken._meta
+    blacklisted = BlacklistedToken._meta
+    token_column = blacklisted.get_field('token').column
+    sql = (
+        f"{connection.ops.insert_statement(on_conflict=OnConflict.IGNORE)} {quote(blacklisted.db_table)} "
+        f"({quote(token_column)}, {quote(blacklisted.get_field('blacklisted_at').column)}) "
+        f"SELECT {quote(outstanding.pk.column)}, %s FROM {quote(outstanding.db_table)} "
+        f"WHERE {quote(outstanding.get_field('user').column)} = %s "
+        f"AND {quote(outstanding.get_field('expires_at').column)} > %s"
+        f"{connection.ops.on_conflict_suffix_sql([blacklisted.get_field('token')], OnConflict.IGNORE, None, None)}"
+    )
+    now = timezone.now()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [now, OutstandingToken._meta.get_field('user').get_db_prep_value(user_id, connection), now])
+        count = cursor.rowcount
+    blacklist_index.refresh(force=True)
+    return count
+
+
+def introspect_tokens(raw_tokens):
+    """
+    Tokenlar ro'yxatini tekshiradi: imzolar siklda tekshiriladi, qora ro'yxat esa barcha refresh
+    tokenlar uchun bitta so'rov bilan (indeks yoqilgan bo'lsa faqat indeksda bor jti lar uchun) aniqlanadi.
+    Token egalarining versiyasi va faolligi ham bitta so'rov bilan olinadi: servisning o'zi rad etadigan
+    tokenlar (eskirgan versiya, faol bo'lmagan yoki o'chirilgan foydalanuvchi) faol deb qaytarilmaydi.
+    Args:
+        raw_tokens (list): Imzolangan tokenlar.
+    Returns:
+        list: Har bir token uchun natija (tokenlar tartibida).
+    """
+    backend = get_token_backend()
+    results = []
+    # Imzosi to'g'ri tokenlar natijasi va ver claim i (bo'lmasa None)
+    decoded = []
+    refresh_jtis = []
+    for raw in raw_tokens:
+        try:
+            payload = backend.decode(raw)
+        except TokenBackendExpiredToken:
+            results.append({"active": False, "error": "expired"})
+            continue
+        except TokenBackendError:
+            results.append({"active": False, "error": "invalid"})
+            continue
+        result = {
+            "active": True,
+            "token_type": payload.get(api_settings.TOKEN_TYPE_CLAIM),
+            "user_id": payload.get(api_settings.USER_ID_CLAIM),
+            "exp": payload.get("exp"),
+            "jti": payload.get(api_settings.JTI_CLAIM),
+            "blacklisted": False,
+        }
+        decoded.append((result, payload.get(VERSION_CLAIM)))
+        # Qora ro'yxatga faqat refresh tokenlar qo'shiladi
+        if result["token_type"] == UserRefreshToken.token_type and result["jti"]:
+            refresh_jtis.append(result["jti"])
+        results.append(result)
+
+    if blacklist_index.enabled:
+        refresh_jtis = [jti for jti in refresh_jtis if blacklist_index.contains(jti)]
+    blacklisted = set()
+    if refresh_jtis:
+        blacklisted = set(
+            BlacklistedToken.objects.filter(token__jti__in=refresh_jtis).values_list('token__jti', flat=True)
+        )
+    for result in results:
+        if result.get("jti") in blacklisted:
+            result["blacklisted"] = True
+            result["active"] = False
+
+    user_ids = {str(result["user_id"]) for result, _ in decoded if result["active"] and result["user_id"]}
+    users = {}
+    if user_ids:
+        users = {
+            str(user_id): (token_version, is_active)
+            for user_id, token_version, is_active in get_user_model().objects.filter(
+                pk__in=user_ids
+            ).values_list('pk', 'token_version', 'is_active')
+        }
+    for result, version in decoded:
+        if not result["active"]:
+            continue
+        user = users.get(str(result["user_id"]))
+        if user is None:
+            result.update(active=False, error="user_not_found")
+            continue
+        token_version, is_active = user
+        if version is None:
+            # ver claim i bo'lmasa CachedJWTAuthentication access tokenni joriy versiyada,
+            # LoginRefreshSerializer esa refresh tokenni 0-versiyada deb hisoblaydi
+            version = 0 if result["token_type"] == UserRefreshToken.token_type else token_version
+        if api_settings.CHECK_USER_IS_ACTIVE and not is_active:
+            result.update(active=False, error="user_inactive")
+        elif version < token_version:
+            result.update(active=False, error="stale")
+    return results
+
+
+def _flush_at_exit():
+    try:
+        outstanding_ledger.flush()
+    except Exception:
+        logger.exception("OutstandingToken yozuvlarini saqlab bo'lmadi")
+
+
+atexit.register(_flush_at_exit)
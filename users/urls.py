@@ -1,12 +1,20 @@
+from django.conf import settings
 from django.urls import path
 from .views import CreateUserView, VerifyApiView, GetNewVerificationView, ChangeUserInformationView, \
-    ChangeUserPhotoView, LoginView, LoginRefreshView, LogOutView, ForgotPasswordView, \
-    ResetPasswordView
+    ChangeUserPhotoView, LoginView, LoginRefreshView, LogOutView, LogOutAllView, ForgotPasswordView, \
+    ResetPasswordView, JWKSView, IntrospectTokensView, UserPhotoView
+
+if settings.ASYNC_AUTH_VIEWS:
+    # ASGI ostida ro'yxatdan o'tish, tasdiqlash, login va logout async viewlar orqali ishlaydi
+    from .async_views import SignUpAsyncView as CreateUserView, VerifyAsyncView as VerifyApiView, \
+        GetNewVerificationAsyncView as GetNewVerificationView, LoginAsyncView as LoginView, \
+        LogOutAsyncView as LogOutView
 
 urlpatterns = [
     path('login/', LoginView.as_view()),
     path('login/refresh/', LoginRefreshView.as_view()),
     path('logout/', LogOutView.as_view()),
+    path('logout-all/', LogOutAllView.as_view()),
     path('forgot-password/', ForgotPasswordView.as_view()),
     path('reset-password/', ResetPasswordView.as_view()),
     path('signup/', CreateUserView.as_view()),
@@ -14,4 +22,7 @@ urlpatterns = [
     path('new-verify/', GetNewVerificationView.as_view()),
     path('change-user/', ChangeUserInformationView.as_view()),
     path('change-user-photo/', ChangeUserPhotoView.as_view()),
+    path('photo/', UserPhotoView.as_view()),
+    path('jwks/', JWKSView.as_view()),
+    path('introspect/', IntrospectTokensView.as_view()),
 ]
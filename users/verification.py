@@ -0,0 +1,130 @@
+import functools
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import EMAIL_EXPIRE
+
+
+class BaseCodeStore:
+    """
+    Tasdiqlash kodlarini saqlash interfeysi. User.create_verify_code va verify viewlari
+    kodlar bilan faqat shu interfeys orqali ishlaydi.
+    """
+    def add(self, user, code):
+        raise NotImplementedError
+
+    def has_active(self, user):
+        """
+        Returns:
+            bool: Foydalanuvchida hali eskirmagan va ishlatilmagan kod bormi.
+        """
+        raise NotImplementedError
+
+    def consume(self, user, code):
+        """
+        Kodni tekshiradi va to'g'ri bo'lsa uni ishlatilgan deb belgilaydi. Bitta kod faqat bir marta
+        qabul qilinadi, hatto parallel so'rovlarda ham.
+        Returns:
+            bool: Kod to'g'ri va yaroqli bo'lsa True.
+        """
+        raise NotImplementedError
+
+    # Async viewlar uchun variantlar, backend o'zining async usulini bermasa alohida threadda bajariladi
+    async def aadd(self, user, code):
+        await sync_to_async(self.add)(user, code)
+
+    async def ahas_active(self, user):
+        return await sync_to_async(self.has_active)(user)
+
+    async def aconsume(self, user, code):
+        return await sync_to_async(self.consume)(user, code)
+
+
+class DatabaseCodeStore(BaseCodeStore):
+    """
+    Kodlarni UserConfirmation jadvalida saqlaydi.
+    """
+    def add(self, user, code):
+        user.verify_codes.create(code=code)
+
+    def has_active(self, user):
+        return user.verify_codes.filter(expiration_time__gte=timezone.now(), is_confirmed=False).exists()
+
+    def consume(self, user, code):
+        # Tekshirish va belgilash bitta UPDATE da bajariladi
+        return user.verify_codes.filter(
+            expiration_time__gte=timezone.now(), code=code, is_confirmed=False
+        ).update(is_confirmed=True) > 0
+
+    async def aadd(self, user, code):
+        await user.verify_codes.acreate(code=code)
+
+    async def ahas_active(self, user):
+        return await user.verify_codes.filter(expiration_time__gte=timezone.now(), is_confirmed=False).aexists()
+
+    async def aconsume(self, user, code):
+        return await user.verify_codes.filter(
+            expiration_time__gte=timezone.now(), code=code, is_confirmed=False
+        ).aupdate(is_confirmed=True) > 0
+
+
+class CacheCodeStore(BaseCodeStore):
+    """
+    Kodlarni Django keshida TTL bilan saqlaydi, eskirgan kodlar keshning o'zi tomonidan o'chiriladi.
+    Har bir kod alohida kalitda turadi va cache.delete() orqali ishlatiladi: kalitni faqat bitta
+    so'rov o'chira oladi, shuning uchun tekshirish va ishlatish atomar. audit=True bo'lsa kodlar
+    UserConfirmation jadvaliga ham yoziladi.
+    """
+    def __init__(self, cache_alias='default', ttl=None, audit=False):
+        self.cache_alias = cache_alias
+        self.ttl = ttl or EMAIL_EXPIRE * 60
+        self.audit = audit
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    @staticmethod
+    def code_key(user, code):
+        return f"verify-code:{user.pk}:{code}"
+
+    @staticmethod
+    def active_key(user):
+        return f"verify-active:{user.pk}"
+
+    def add(self, user, code):
+        self.cache.set_many({self.code_key(user, code): 1, self.active_key(user): 1}, self.ttl)
+        if self.audit:
+            user.verify_codes.create(code=code)
+
+    def has_active(self, user):
+        return self.cache.get(self.active_key(user)) is not None
+
+    async def ahas_active(self, user):
+        return await self.cache.aget(self.active_key(user)) is not None
+
+    def consume(self, user, code):
+        if not code or not self.cache.delete(self.code_key(user, code)):
+            return False
+        # Kod ishlatildi, foydalanuvchi endi yangi kod so'rashi mumkin
+        self.cache.delete(self.active_key(user))
+        if self.audit:
+            user.verify_codes.filter(
+                code=code, is_confirmed=False, expiration_time__gte=timezone.now() - timedelta(seconds=self.ttl)
+            ).update(is_confirmed=True)
+        return True
+
+
+@functools.lru_cache(maxsize=None)
+def get_code_store():
+    """
+    VERIFICATION_CODE_STORE sozlamasidagi backend ni qaytaradi (jarayon davomida bitta obyekt).
+    """
+    options = getattr(settings, 'VERIFICATION_CODE_STORE', {})
+    backend = import_string(options.get('BACKEND', 'users.verification.DatabaseCodeStore'))
+    return backend(**options.get('OPTIONS', {}))
@@ -1,19 +1,23 @@
-from datetime import datetime
-
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
 from rest_framework import permissions
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.exceptions import ValidationError, NotFound
 from rest_framework_simplejwt.exceptions import TokenError
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
 
+from shared.throttling import LoginThrottle, SignUpThrottle, VerifyThrottle, ForgotPasswordThrottle
 from shared.utility import send_email
 from .models import User, NEW, CODE_VERIFIED
+from .jwks import get_jwks_document
+from .permissions import IsIntrospectionClient
+from .photos import FORMATS, DEFAULT_FORMAT, pick_variant
+from .tokens import UserRefreshToken, introspect_tokens
+from .verification import get_code_store
 from .serializers import SignUpSerializer, ChangeUserInformation, ChangeUserPhotoSerializer, LoginSerializer, \
-    LoginRefreshSerializer, LogoutSerializer, ForgotPasswordSerializer, ResetPasswordSerializer
+    LoginRefreshSerializer, LogoutSerializer, ForgotPasswordSerializer, ResetPasswordSerializer, IntrospectSerializer
 from rest_framework.generics import CreateAPIView, UpdateAPIView
 
 
@@ -21,11 +25,14 @@ class CreateUserView(CreateAPIView):
     queryset = User.objects.all()
     permission_classes = [permissions.AllowAny]
     serializer_class = SignUpSerializer
+    throttle_classes = [SignUpThrottle, ]
 
 
 class VerifyApiView(APIView):
     # Foydalanuvchi autentifikatsiyadan o'tganligini tekshirish uchun ruxsat beruvchi sinf
     permission_classes = [IsAuthenticated, ]
+    # Kodni tanlab topishga urinishlarni cheklash
+    throttle_classes = [VerifyThrottle, ]
 
     def post(self, request, *args, **kwargs):
         # Foydalanuvchi obyektini olish (foydalanuvchi autentifikatsiyadan o'tgan bo'lishi kerak)
@@ -34,39 +41,32 @@ class VerifyApiView(APIView):
         code = self.request.data.get('code')
         # Tasdiqlash kodini tekshirish
         self.check_verify(user, code)
+        # Foydalanuvchiga bitta kirish va yangilanish tokenlari juftligini chiqarish
+        tokens = user.token(endpoint='verify')
         # Tasdiqlash muvaffaqiyatli bo'lsa, javobni qaytarish
         return Response(
             {
                 "success": True,
                 "auth_status": user.auth_status,
-                # Foydalanuvchiga kirish va yangilanish tokenlarini qaytarish
-                "access": user.token()['access'],
-                "refresh": user.token()['refresh_token']
+                "access": tokens['access'],
+                "refresh": tokens['refresh_token']
             }
         )
 
     @staticmethod
     def check_verify(user, code):
-        # Foydalanuvchi tomonidan yuborilgan kodning amal qilish muddati va tasdiqlanganligini tekshirish
-        verifies = user.verify_codes.filter(expiration_time__gte=datetime.now(), code=code, is_confirmed=False)
-
-        # Agar bunday tasdiqlash kodi mavjud bo'lmasa
-        if not verifies.exists():
+        # Kodni tekshirish va ishlatilgan deb belgilash (bitta atomar amal)
+        if not get_code_store().consume(user, code):
             data = {
                 "message": "Tasdiqlash kodingiz xato yoki eskirgan"
             }
             # Xatolikni qaytarish
             raise ValidationError(data)
-        else:
-            # Agar kod to'g'ri bo'lsa, tasdiqlanganligini yangilash
-            verifies.update(is_confirmed=True)
 
         # Agar foydalanuvchining autentifikatsiya holati 'NEW' bo'lsa
         if user.auth_status == NEW:
-            # Autentifikatsiya holatini 'CODE_VERIFIED' ga o'zgartirish
-            user.auth_status = CODE_VERIFIED
-            # O'zgarishlarni saqlash
-            user.save()
+            # Autentifikatsiya holatini bitta shartli UPDATE bilan 'CODE_VERIFIED' ga o'zgartirish
+            user.transition_auth_status(NEW, CODE_VERIFIED)
         # Va True qaytaramiz
         return True
 
@@ -80,10 +80,12 @@ class GetNewVerificationView(APIView):
         user = self.request.user
         # Foydalanuvchining tasdiqlash kodini tekshirish
         self.check_verification(user)
-        # Foydalanuvchi uchun yangi tasdiqlash kodini yaratish
-        code = user.create_verify_code()
-        # Yangi tasdiqlash kodini foydalanuvchiga elektron pochta orqali yuborish
-        send_email(user, code)
+        # Kod va email bitta tranzaksiyada yoziladi
+        with transaction.atomic():
+            # Foydalanuvchi uchun yangi tasdiqlash kodini yaratish
+            code = user.create_verify_code()
+            # Yangi tasdiqlash kodini foydalanuvchiga elektron pochta orqali yuborish
+            send_email(user.email, code)
         # Muvaffaqiyatli javobni qaytarish
         return Response(
             {
@@ -94,11 +96,8 @@ class GetNewVerificationView(APIView):
 
     @staticmethod
     def check_verification(user):
-        # Foydalanuvchi tomonidan yaratilgan va hali eskirmagan, tasdiqlanmagan tasdiqlash kodlarini olish
-        verifies = user.verify_codes.filter(expiration_time__gte=datetime.now(), is_confirmed=False)
-
-        # Agar bunday tasdiqlash kodlari mavjud bo'lsa
-        if verifies.exists():
+        # Foydalanuvchida hali eskirmagan, tasdiqlanmagan tasdiqlash kodi mavjud bo'lsa
+        if get_code_store().has_active(user):
             data = {
                 "message": "Kodingiz hali ishlatish uchun yaroqli, birozdan keyin urinib ko'ring"
             }
@@ -106,6 +105,15 @@ class GetNewVerificationView(APIView):
             raise ValidationError(data)
 
 
+def renewed_tokens(user, version, endpoint):
+    # Holat o'zgarganda token versiyasi oshadi va eski refresh tokenlar endi yangilanmaydi,
+    # shuning uchun javobda yangi juftlik beriladi
+    if user.token_version == version:
+        return {}
+    tokens = user.token(endpoint=endpoint)
+    return {"access": tokens['access'], "refresh": tokens['refresh_token']}
+
+
 class ChangeUserInformationView(UpdateAPIView):
     # Foydalanuvchi faqat autentifikatsiyadan o'tgan bo'lishi kerak
     permission_classes = [IsAuthenticated, ]
@@ -122,6 +130,7 @@ class ChangeUserInformationView(UpdateAPIView):
 
     # Foydalanuvchi ma'lumotlarini yangilash
     def update(self, request, *args, **kwargs):
+        version = request.user.token_version
         super(ChangeUserInformationView, self).update(request, *args, **kwargs)
 
         # Yangilangan ma'lumotlarni qaytarish uchun javob yaratish
@@ -130,10 +139,12 @@ class ChangeUserInformationView(UpdateAPIView):
             "message": "User updated successfully",
             "auth_status": request.user.auth_status
         }
+        data.update(renewed_tokens(request.user, version, 'change_user'))
         return Response(data, status=200)
 
     # Foydalanuvchi ma'lumotlarini qisman yangilash
     def partial_update(self, request, *args, **kwargs):
+        version = request.user.token_version
         super(ChangeUserInformationView, self).partial_update(request, *args, **kwargs)
 
         # Qisman yangilangan ma'lumotlarni qaytarish uchun javob yaratish
@@ -142,6 +153,7 @@ class ChangeUserInformationView(UpdateAPIView):
             "message": "User updated successfully",
             "auth_status": request.user.auth_status
         }
+        data.update(renewed_tokens(request.user, version, 'change_user'))
         return Response(data, status=200)
 
 class ChangeUserPhotoView(UpdateAPIView):
@@ -149,19 +161,49 @@ class ChangeUserPhotoView(UpdateAPIView):
     serializer_class = ChangeUserPhotoSerializer
     def put(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
-
-        if serializer.is_valid():
-            user = request.user
-            serializer.update(user, serializer.validated_data)
-            return Response({
-                "message": "Rasm muvaffaqiyatli yangilandi"
-            })
+        serializer.is_valid(raise_exception=True)
+        version = request.user.token_version
+        serializer.update(request.user, serializer.validated_data)
+        data = {
+            "message": "Rasm muvaffaqiyatli yangilandi"
+        }
+        data.update(renewed_tokens(request.user, version, 'change_photo'))
+        return Response(data)
     def get_serializer_class(self):
         return self.serializer_class
 
 
+class UserPhotoView(APIView):
+    permission_classes = [IsAuthenticated, ]
+
+    def get(self, request, *args, **kwargs):
+        # Mijoz kerakli o'lcham (?size=150) va formatni (?image_format=webp) so'raydi
+        user = request.user
+        if not user.photo:
+            raise NotFound({"success": False, "message": "Rasm yuklanmagan"})
+        try:
+            size = int(request.query_params.get('size', 0))
+        except ValueError:
+            raise ValidationError({"success": False, "message": "size butun son bo'lishi kerak"})
+        # Javob JSON, shuning uchun Accept sarlavhasi emas, faqat ?image_format hisobga olinadi
+        image_format = request.query_params.get('image_format', DEFAULT_FORMAT)
+        if image_format not in FORMATS:
+            raise ValidationError({
+                "success": False,
+                "message": f"image_format {', '.join(FORMATS)} dan biri bo'lishi kerak"
+            })
+        name, variant_size = pick_variant(user, size, image_format)
+        return Response({
+            "success": True,
+            "photo": user.photo.storage.url(name),
+            "size": variant_size,
+            "sizes": sorted(int(value) for value in user.photo_variants or {}),
+        })
+
+
 class LoginView(TokenObtainPairView):
     serializer_class = LoginSerializer
+    throttle_classes = [LoginThrottle, ]
 
 class LoginRefreshView(TokenObtainPairView):
     serializer_class = LoginRefreshSerializer
@@ -176,7 +218,7 @@ class LogOutView(APIView):
         serializer.is_valid(raise_exception=True)
         try:
             refresh_token = self.request.data['refresh']
-            token = RefreshToken(refresh_token)
+            token = UserRefreshToken(refresh_token)
             token.blacklist()
             data = {
                 "success": True,
@@ -186,24 +228,39 @@ class LogOutView(APIView):
         except TokenError:
             return Response(status=400)
 
+class LogOutAllView(APIView):
+    # Foydalanuvchining barcha qurilmalardagi sessiyalarini bekor qilish
+    permission_classes = [IsAuthenticated, ]
+
+    def post(self, request, *args, **kwargs):
+        count = request.user.revoke_sessions()
+        return Response({
+            "success": True,
+            "message": "Barcha sessiyalardan chiqdingiz",
+            "revoked": count
+        }, status=200)
+
 class ForgotPasswordView(APIView):
     permission_classes = [AllowAny, ]
     serializer_class = ForgotPasswordSerializer
+    throttle_classes = [ForgotPasswordThrottle, ]
 
     def post(self, request, *args, **kwargs):
         serializer = self.serializer_class(data=self.request.data)
         serializer.is_valid(raise_exception=True)
         email = serializer.validated_data.get('email')
         user = serializer.validated_data.get('user')
-        code = user.create_verify_code()
-        send_email(email, code)
+        with transaction.atomic():
+            code = user.create_verify_code()
+            send_email(email, code)
 
+        tokens = user.token(endpoint='forgot_password')
         return Response(
             {
                 "success": True,
                 "message": "Tasqtilash kodi muvvaqiyatli yuborildi",
-                "access": user.token()['access'],
-                "refresh": user.token()['refresh_token'],
+                "access": tokens['access'],
+                "refresh": tokens['refresh_token'],
                 "user_status": user.auth_status
             }, status=200
         )
@@ -223,12 +280,37 @@ class ResetPasswordView(UpdateAPIView):
             user = User.objects.get(id=response.data.get('id'))
         except ObjectDoesNotExist as e:
             raise NotFound(detail="User not found")
+        # Parol o'zgargach eski sessiyalarning barchasini bekor qilish
+        user.revoke_sessions()
+        tokens = user.token(endpoint='reset_password')
         return Response({
             "success": True,
             "message": "Parolingiz muvaffaqiyatli yangilandi",
-            "access": user.token()['access'],
-            "refresh": user.token()['refresh_token']
+            "access": tokens['access'],
+            "refresh": tokens['refresh_token']
         })
 
 
+class JWKSView(APIView):
+    # Boshqa servislar tokenlarni mahalliy tekshirishi uchun ochiq kalitlar (JWKS)
+    permission_classes = [AllowAny, ]
+    authentication_classes = []
+
+    def get(self, request, *args, **kwargs):
+        response = Response(get_jwks_document())
+        response['Cache-Control'] = 'public, max-age=300'
+        return response
+
 
+class IntrospectTokensView(APIView):
+    # API gateway lar uchun bir so'rovda ko'p tokenni tekshirish
+    permission_classes = [IsIntrospectionClient, ]
+    authentication_classes = []
+    serializer_class = IntrospectSerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.serializer_class(data=self.request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response({
+            "results": introspect_tokens(serializer.validated_data['tokens'])
+        })